@@ -1,10 +1,16 @@
+import pandas as pd
+import pyarrow as pa
 from fastapi import HTTPException, Query, Depends
-from typing import List
+from typing import List, Sequence, Union
 from app.services.cache_service import get_cache
 
 
-def requires_cache(fields: List[str]):
-    """Dependency to check if required fields exist in cache."""
+def requires_cache(fields: List[str], arrow: Sequence[str] = ()):
+    """
+    Dependency to check if required fields exist in cache. Fields named in
+    arrow are read with get_arrow, so a spilled frame arrives as its
+    memory-mapped table for routes that only need a slice of it.
+    """
 
     def dependency(id: str = Query(..., description="Cache ID")):
         cache = get_cache()
@@ -12,13 +18,23 @@ def requires_cache(fields: List[str]):
         if not id:
             raise HTTPException(status_code=400, detail="No id provided")
 
+        field_values = {}
         for field in fields:
-            if cache.get(id=id, field=field) is None:
+            get = cache.get_arrow if field in arrow else cache.get
+            field_values[field] = get(id=id, field=field)
+            if field_values[field] is None:
                 raise HTTPException(status_code=400, detail=f"No {field} found")
 
-        field_values = {field: cache.get(id=id, field=field) for field in fields}
         field_values["id"] = id
 
         return field_values
 
     return dependency
+
+
+def head(df: Union[pd.DataFrame, pa.Table], rows: int) -> pd.DataFrame:
+    """Return the first rows of a cached frame or memory-mapped table."""
+    if isinstance(df, pa.Table):
+        return df.slice(0, rows).to_pandas()
+
+    return df.head(rows)
@@ -0,0 +1,8 @@
+from pydantic import BaseModel
+
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+def sse_event(payload: BaseModel) -> str:
+    """Encode a response model as a server-sent event named after its type."""
+    return f"event: {payload.type}\ndata: {payload.model_dump_json()}\n\n"
@@ -0,0 +1,120 @@
+import json
+import asyncio
+from app.services.cache_service import get_cache
+from app.services.chart_service import get_janitor
+from app.services.history_service import get_history
+from app.services.question_service import (
+    answer_question,
+    run_query,
+    describe_result,
+    chart_result,
+    suggest_followups,
+)
+from app.api.events import SSE_HEADERS, sse_event
+from fastapi import APIRouter, Query
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from app.models.responses import (
+    ErrorResponse,
+    SQLResponse,
+    DataFrameResponse,
+    PlotlyFigureResponse,
+    QuestionListResponse,
+)
+
+router = APIRouter(prefix="/api", tags=["ask"])
+
+
+@router.get("/ask")
+async def ask(
+    question: str = Query(..., description="Question to answer"),
+    render: bool = Query(True, description="Rasterize the chart to a JPEG"),
+):
+    """
+    Answer a question in one request, streaming each stage as a server-sent
+    event as soon as it is ready: sql, df, then plotly_figure and
+    question_list in whichever order they finish, and finally done. A failed
+    stage is reported as an error event. Everything is stored under the cache
+    id from the sql event, so the per-stage endpoints work on it afterwards.
+    """
+    return StreamingResponse(
+        _ask_events(question, render),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS,
+    )
+
+
+async def _ask_events(question, render):
+    """Run the question flow and yield its stages as server-sent events."""
+    cache = get_cache()
+    id = cache.generate_id()
+    stage = "sql"
+
+    try:
+        sql = await answer_question(question)
+        await run_in_threadpool(cache.set, id=id, field="question", value=question)
+        await run_in_threadpool(cache.set, id=id, field="sql", value=sql)
+        await run_in_threadpool(get_history().record, id, question, sql)
+        yield sse_event(SQLResponse(id=id, text=sql))
+
+        stage = "df"
+        df = await run_query(sql)
+        await run_in_threadpool(cache.set, id=id, field="df", value=df)
+        df_json, df_markdown, digest = await run_in_threadpool(describe_result, df)
+        yield sse_event(
+            DataFrameResponse(
+                id=id,
+                df=df_json,
+                df_markdown=df_markdown,
+                row_count=len(df),
+                digest=digest,
+            )
+        )
+    except Exception as e:
+        yield sse_event(ErrorResponse(id=id, stage=stage, error=str(e)))
+        return
+
+    tasks = [
+        asyncio.ensure_future(_chart(id, question, sql, df, render)),
+        asyncio.ensure_future(_followups(id, question, sql, df)),
+    ]
+    try:
+        for next_stage in asyncio.as_completed(tasks):
+            yield sse_event(await next_stage)
+    finally:
+        for task in tasks:
+            task.cancel()
+
+    yield f"event: done\ndata: {json.dumps({'type': 'done', 'id': id})}\n\n"
+
+
+async def _chart(id, question, sql, df, render):
+    """Build the chart stage event."""
+    try:
+        fig_json, chart_url = await chart_result(question, sql, df, render)
+        cache = get_cache()
+        await run_in_threadpool(cache.set, id=id, field="fig_json", value=fig_json)
+
+        if chart_url is None:
+            return PlotlyFigureResponse(id=id, fig_json=fig_json)
+
+        await run_in_threadpool(cache.set, id=id, field="chart_url", value=chart_url)
+        get_janitor().track(id, chart_url)
+        return PlotlyFigureResponse(id=id, chart_url=chart_url)
+    except Exception as e:
+        return ErrorResponse(id=id, stage="plotly_figure", error=str(e))
+
+
+async def _followups(id, question, sql, df):
+    """Build the follow-up questions stage event."""
+    try:
+        followup_questions = await suggest_followups(question, sql, df)
+        get_cache().set(id=id, field="followup_questions", value=followup_questions)
+
+        return QuestionListResponse(
+            id=id,
+            questions=followup_questions,
+            header="Here are some followup questions you can ask:",
+        )
+    except Exception as e:
+        return ErrorResponse(id=id, stage="question_list", error=str(e))
@@ -1,38 +1,123 @@
-from fastapi import APIRouter, HTTPException, Depends
+import pyarrow as pa
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Depends, Query
 from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from app.config import settings
 from app.models.responses import DataFrameResponse
-from app.services.vanna_service import vanna
+from app.services.cache_service import get_cache
+from app.services.executor_service import get_executor
+from app.services.database_service import StreamLimitError, iter_batches
+from app.services.result_cache_service import normalize_sql
+from app.services.training_service import training_page
+from app.services.export_service import (
+    frame_chunks,
+    table_chunks,
+    table_frames,
+    drop_index,
+    cursor_chunks,
+    cursor_tables,
+    result_schema,
+    csv_chunks,
+    gzip_chunks,
+    arrow_chunks,
+)
 from app.api.dependencies import requires_cache
-import io
 
 router = APIRouter(prefix="/api", tags=["data"])
 
 
+EXPORT_FORMATS = {
+    "csv": ("text/csv", "csv"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+    "arrow": ("application/vnd.apache.arrow.stream", "arrow"),
+}
+
+
 @router.get("/download_csv")
-async def download_csv(cache_data: dict = Depends(requires_cache(["df"]))):
-    """Download query results as CSV file."""
+async def download_csv(
+    cache_data: dict = Depends(requires_cache(["sql"])),
+    format: str = Query("csv", pattern="^(csv|parquet|arrow)$"),
+    gzip: bool = Query(False, description="Gzip-compress CSV output"),
+):
+    """
+    Download query results as a CSV, Parquet or Arrow file. The file is
+    written in chunks from the cached result, or from a re-executed database
+    cursor when the result is no longer cached. Results the cache spilled to
+    disk are streamed in slices of their memory-mapped Arrow file. Parquet and
+    Arrow files need column types before the first chunk is sent, so a cursor
+    is read once to type the columns from all their values, then again to
+    stream them.
+    """
     try:
-        df = cache_data["df"]
+        cache = get_cache()
+        sql_executor = get_executor("sql")
         id = cache_data["id"]
+        rows = settings.export_chunk_rows
+
+        df = await run_in_threadpool(cache.get_arrow, id=id, field="df")
+        if isinstance(df, pa.Table):
+            if format == "csv":
+                chunks = table_frames(df, rows)
+            else:
+                table = drop_index(df)
+                chunks = table_chunks(table, rows)
+                schema = table.schema
+        elif df is not None:
+            chunks = frame_chunks(df, rows)
+            schema = pa.Schema.from_pandas(df, preserve_index=False).remove_metadata()
+        elif format == "csv":
+            sql = normalize_sql(cache_data["sql"])
+            columns, batches = await sql_executor.run(iter_batches, sql, 0, rows)
+            chunks = cursor_chunks(columns, batches)
+        else:
+            sql = normalize_sql(cache_data["sql"])
+            columns, batches = await sql_executor.run(iter_batches, sql, 0, rows)
+            schema = await sql_executor.run(result_schema, columns, batches)
+            _, batches = await sql_executor.run(iter_batches, sql, 0, rows)
+            chunks = cursor_tables(schema, batches)
 
-        csv_data = df.to_csv()
+        media_type, extension = EXPORT_FORMATS[format]
+        if format == "csv":
+            content = csv_chunks(chunks)
+            if gzip:
+                content = gzip_chunks(content)
+                media_type, extension = "application/gzip", "csv.gz"
+        else:
+            content = arrow_chunks(chunks, format=format, schema=schema)
 
         return StreamingResponse(
-            io.StringIO(csv_data),
-            media_type="text/csv",
-            headers={"Content-Disposition": f"attachment; filename={id}.csv"},
+            content,
+            media_type=media_type,
+            headers={
+                "Content-Disposition": f"attachment; filename={id}.{extension}"
+            },
         )
+    except StreamLimitError as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.get("/get_training_data", response_model=DataFrameResponse)
-async def get_training_data():
-    """Get current training data."""
+async def get_training_data(
+    type: Optional[str] = Query(
+        None, pattern="^(sql|ddl|documentation)$", description="Training data type"
+    ),
+    search: Optional[str] = Query(None, description="Case-sensitive substring"),
+    offset: int = Query(0, ge=0, description="Index of the first item"),
+    limit: int = Query(25, ge=1, le=1000, description="Items per page"),
+):
+    """Get one page of training data, optionally filtered by type and text."""
     try:
-        df = vanna.get_training_data()
+        training = get_executor("training")
+        df, total = await training.run(training_page, type, search, offset, limit)
+        df_markdown = await run_in_threadpool(df.to_markdown, index=False)
         return DataFrameResponse(
-            id="training_data", df=df.head(25).to_json(orient="records")
+            id="training_data",
+            df=df.to_json(orient="records"),
+            df_markdown=df_markdown,
+            row_count=total,
         )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
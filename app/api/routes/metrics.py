@@ -0,0 +1,92 @@
+from fastapi import APIRouter
+from fastapi.responses import Response
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from app.services.cache_service import get_cache
+from app.services.answer_cache_service import get_answer_cache
+from app.services.result_cache_service import get_result_cache
+from app.services.plotly_cache_service import get_plotly_cache
+from app.services.embedding_cache_service import get_embedding_cache
+from app.services.chart_service import get_janitor
+from app.services.executor_service import executors
+from app.services.singleflight_service import flights
+from app.services.metrics_service import metrics_registry
+
+router = APIRouter(tags=["metrics"])
+
+
+class StatsCollector:
+    """
+    Expose the counters behind /api/stats as gauges at scrape time. With
+    several workers they describe the worker serving the scrape; the stage,
+    request and token metrics are added up across all of them.
+    """
+
+    def collect(self):
+        caches = {
+            "cache": get_cache(),
+            "answer_cache": get_answer_cache(),
+            "result_cache": get_result_cache(),
+            "plotly_cache": get_plotly_cache(),
+            "embedding_cache": get_embedding_cache(),
+        }
+        hit_ratio = GaugeMetricFamily(
+            "vanna_cache_hit_ratio", "Hit ratio of each cache", labels=["cache"]
+        )
+        entries = GaugeMetricFamily(
+            "vanna_cache_entries", "Entries held by each cache", labels=["cache"]
+        )
+        for name, cache in caches.items():
+            stats = cache.stats()
+            hit_ratio.add_metric([name], stats["hit_ratio"])
+            entries.add_metric([name], stats["entries"])
+
+        queued = GaugeMetricFamily(
+            "vanna_executor_queued", "Calls waiting for a worker", labels=["executor"]
+        )
+        running = GaugeMetricFamily(
+            "vanna_executor_running", "Calls being run", labels=["executor"]
+        )
+        for name, executor in executors.items():
+            stats = executor.stats()
+            queued.add_metric([name], stats["queued"])
+            running.add_metric([name], stats["running"])
+
+        inflight = GaugeMetricFamily(
+            "vanna_singleflight_inflight",
+            "Distinct calls in flight per stage",
+            labels=["stage"],
+        )
+        for name, flight in flights.items():
+            inflight.add_metric([name], flight.stats()["inflight"])
+
+        charts = get_janitor().stats()
+        chart_files = GaugeMetricFamily(
+            "vanna_chart_files", "Chart images in the static folder at the last sweep"
+        )
+        chart_files.add_metric([], charts["files"])
+        chart_bytes = GaugeMetricFamily(
+            "vanna_chart_bytes", "Bytes of chart images at the last sweep"
+        )
+        chart_bytes.add_metric([], charts["bytes"])
+        deleted = CounterMetricFamily(
+            "vanna_chart_deleted", "Chart images deleted by the janitor"
+        )
+        deleted.add_metric([], charts["deleted"])
+        reclaimed = CounterMetricFamily(
+            "vanna_chart_reclaimed_bytes", "Bytes freed by deleting chart images"
+        )
+        reclaimed.add_metric([], charts["reclaimed_bytes"])
+
+        yield from (hit_ratio, entries, queued, running, inflight)
+        yield from (chart_files, chart_bytes, deleted, reclaimed)
+
+
+registry = metrics_registry()
+registry.register(StatsCollector())
+
+
+@router.get("/metrics")
+async def metrics():
+    """Expose metrics in the Prometheus text format."""
+    return Response(generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
@@ -1,9 +1,13 @@
-from fastapi import APIRouter, HTTPException, Depends
-from typing import List, Dict, Any
+from fastapi import APIRouter, HTTPException, Depends, Query
+from typing import List, Dict, Any, Optional
+from starlette.concurrency import run_in_threadpool
 from app.models.responses import QuestionListResponse, QuestionHistoryResponse
 from app.services.vanna_service import vanna
 from app.services.cache_service import get_cache
-from app.api.dependencies import requires_cache
+from app.services.executor_service import get_executor
+from app.services.question_service import suggest_followups
+from app.services.history_service import get_history
+from app.api.dependencies import requires_cache, head
 
 router = APIRouter(prefix="/api", tags=["questions"])
 
@@ -12,7 +16,8 @@ router = APIRouter(prefix="/api", tags=["questions"])
 async def generate_questions():
     """Generate sample questions based on the database schema."""
     try:
-        questions = vanna.generate_questions()
+        llm = get_executor("llm")
+        questions = await llm.run(vanna.generate_questions)
         return QuestionListResponse(
             questions=questions, header="Here are some questions you can ask:"
         )
@@ -22,20 +27,21 @@ async def generate_questions():
 
 @router.get("/generate_followup_questions", response_model=QuestionListResponse)
 async def generate_followup_questions(
-    cache_data: dict = Depends(requires_cache(["df", "question", "sql"]))
+    cache_data: dict = Depends(requires_cache(["df", "question", "sql"], arrow=["df"]))
 ):
     """Generate follow-up questions based on previous query results."""
     try:
         cache = get_cache()
-        df = cache_data["df"]
+        # vanna only shows the LLM the first 25 rows.
+        df = head(cache_data["df"], 25)
         question = cache_data["question"]
         sql = cache_data["sql"]
         id = cache_data["id"]
 
-        followup_questions = vanna.generate_followup_questions(
-            question=question, sql=sql, df=df
+        followup_questions = await suggest_followups(question, sql, df)
+        await run_in_threadpool(
+            cache.set, id=id, field="followup_questions", value=followup_questions
         )
-        cache.set(id=id, field="followup_questions", value=followup_questions)
 
         return QuestionListResponse(
             id=id,
@@ -47,11 +53,17 @@ async def generate_followup_questions(
 
 
 @router.get("/get_question_history", response_model=QuestionHistoryResponse)
-async def get_question_history():
-    """Get history of all asked questions."""
+async def get_question_history(
+    cursor: Optional[int] = Query(None, description="next_cursor of the last page"),
+    limit: int = Query(50, ge=1, le=500, description="Questions per page"),
+    search: Optional[str] = Query(None, description="Words in the question or SQL"),
+):
+    """Get asked questions, newest first, one page at a time."""
     try:
-        cache = get_cache()
-        questions = cache.get_all(field_list=["question"])
-        return QuestionHistoryResponse(questions=questions)
+        history = get_history()
+        questions, next_cursor = await run_in_threadpool(
+            history.page, cursor, limit, search
+        )
+        return QuestionHistoryResponse(questions=questions, next_cursor=next_cursor)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
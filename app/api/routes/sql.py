@@ -1,14 +1,35 @@
-import os
-import uuid
-from app.config import settings
-from urllib.parse import urljoin
-from app.services.vanna_service import vanna
+import json
+import asyncio
+import pyarrow as pa
 from app.services.cache_service import get_cache
-from app.api.dependencies import requires_cache
+from app.services.result_cache_service import normalize_sql, is_read_only
+from app.services.database_service import (
+    StreamLimitError,
+    fetch_page,
+    iter_batches,
+)
+from app.services.executor_service import get_executor
+from app.services.chart_service import get_janitor
+from app.services.vanna_service import RESET
+from app.services.question_service import (
+    answer_question,
+    run_query,
+    describe_result,
+    chart_result,
+)
+from app.services.history_service import get_history
+from app.api.dependencies import requires_cache, head
+from app.api.events import SSE_HEADERS, sse_event
 from fastapi import APIRouter, HTTPException, Query, Depends
+from fastapi.responses import Response, StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from app.models.responses import (
+    ErrorResponse,
     SQLResponse,
+    TokenResponse,
+    ResetResponse,
     DataFrameResponse,
+    DataFramePageResponse,
     PlotlyFigureResponse,
     QuestionCacheResponse,
 )
@@ -24,16 +45,69 @@ async def generate_sql(
     try:
         cache = get_cache()
         id = cache.generate_id()
-        sql = vanna.generate_sql(question=question, allow_llm_to_see_data=True)
 
-        cache.set(id=id, field="question", value=question)
-        cache.set(id=id, field="sql", value=sql)
+        sql = await answer_question(question)
+
+        await run_in_threadpool(cache.set, id=id, field="question", value=question)
+        await run_in_threadpool(cache.set, id=id, field="sql", value=sql)
+        await run_in_threadpool(get_history().record, id, question, sql)
 
         return SQLResponse(id=id, text=sql)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/generate_sql_stream")
+async def generate_sql_stream(
+    question: str = Query(..., description="Question to generate SQL for")
+):
+    """
+    Generate SQL for a question, streaming the LLM's response as token
+    server-sent events while it is written. The SQL extracted from the
+    finished response follows as a sql event and is cached under its id, as
+    /api/generate_sql does; a failure is sent as an error event instead.
+    """
+    return StreamingResponse(
+        _sql_events(question), media_type="text/event-stream", headers=SSE_HEADERS
+    )
+
+
+async def _sql_events(question):
+    """
+    Yield tokens of the SQL as they arrive, then the extracted SQL. A reset
+    event means the tokens so far were an intermediate query and the final
+    answer follows.
+    """
+    cache = get_cache()
+    id = cache.generate_id()
+    loop = asyncio.get_running_loop()
+    tokens = asyncio.Queue()
+
+    def on_token(text):
+        loop.call_soon_threadsafe(tokens.put_nowait, text)
+
+    # Tokens are queued before the answer resolves, so None always comes last.
+    answer = asyncio.ensure_future(answer_question(question, on_token))
+    answer.add_done_callback(lambda _: tokens.put_nowait(None))
+
+    try:
+        while (text := await tokens.get()) is not None:
+            if text == RESET:
+                yield sse_event(ResetResponse(id=id))
+            else:
+                yield sse_event(TokenResponse(id=id, text=text))
+
+        sql = answer.result()
+        await run_in_threadpool(cache.set, id=id, field="question", value=question)
+        await run_in_threadpool(cache.set, id=id, field="sql", value=sql)
+        await run_in_threadpool(get_history().record, id, question, sql)
+        yield sse_event(SQLResponse(id=id, text=sql))
+    except Exception as e:
+        yield sse_event(ErrorResponse(id=id, stage="sql", error=str(e)))
+    finally:
+        answer.cancel()
+
+
 @router.get("/run_sql", response_model=DataFrameResponse)
 async def run_sql(cache_data: dict = Depends(requires_cache(["sql"]))):
     """Execute SQL query and return results."""
@@ -42,27 +116,108 @@ async def run_sql(cache_data: dict = Depends(requires_cache(["sql"]))):
         sql = cache_data["sql"]
         id = cache_data["id"]
 
-        df = vanna.run_sql(sql=sql)
-        cache.set(id=id, field="df", value=df)
-        df_markdown = df.to_markdown(index=False)
+        df = await run_query(sql)
+        await run_in_threadpool(cache.set, id=id, field="df", value=df)
+        df_json, df_markdown, digest = await run_in_threadpool(describe_result, df)
 
         return DataFrameResponse(
             id=id,
-            df=df.head(10).to_json(orient="records"),
+            df=df_json,
             df_markdown=df_markdown,
+            row_count=len(df),
+            digest=digest,
         )
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/run_sql_page", response_model=DataFramePageResponse)
+async def run_sql_page(
+    cache_data: dict = Depends(requires_cache(["sql"])),
+    offset: int = Query(0, ge=0, description="Index of the first row"),
+    limit: int = Query(1000, ge=1, le=10000, description="Rows per page"),
+    format: str = Query("json", pattern="^(json|arrow)$", description="json or arrow"),
+):
+    """
+    Return one page of query results. Pages are sliced from the cached result
+    when there is one, otherwise read from the database with LIMIT/OFFSET.
+    """
+    sql = normalize_sql(cache_data["sql"])
+    if not is_read_only(sql):
+        raise HTTPException(status_code=400, detail="Only SELECT queries can be paged")
+
+    try:
+        sql_executor = get_executor("sql")
+        id = cache_data["id"]
+
+        page = await run_in_threadpool(_cached_page, id, offset, limit)
+        if page is not None:
+            columns, rows, has_more = page
+        else:
+            columns, rows, has_more = await sql_executor.run(
+                fetch_page, sql, offset, limit
+            )
+
+        next_offset = offset + len(rows) if has_more else None
+
+        if format == "arrow":
+            return Response(
+                content=await run_in_threadpool(_arrow_page, columns, rows),
+                media_type="application/vnd.apache.arrow.stream",
+                headers={"X-Next-Offset": str(next_offset or "")},
+            )
+
+        return DataFramePageResponse(
+            id=id,
+            columns=columns,
+            rows=[list(row) for row in rows],
+            offset=offset,
+            limit=limit,
+            next_offset=next_offset,
+        )
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/stream_sql")
+async def stream_sql(
+    cache_data: dict = Depends(requires_cache(["sql"])),
+    offset: int = Query(0, ge=0, description="Index of the first row"),
+    batch_size: int = Query(1000, ge=1, le=10000, description="Rows per batch"),
+):
+    """
+    Stream query results as NDJSON straight from the database cursor. The first
+    line holds the column names and every following line is one row.
+    """
+    sql = normalize_sql(cache_data["sql"])
+    if offset and not is_read_only(sql):
+        raise HTTPException(status_code=400, detail="Only SELECT queries can be paged")
+
+    try:
+        sql_executor = get_executor("sql")
+        columns, batches = await sql_executor.run(iter_batches, sql, offset, batch_size)
+
+        return StreamingResponse(
+            _ndjson(columns, batches), media_type="application/x-ndjson"
+        )
+
+    except StreamLimitError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.get("/generate_plotly_figure", response_model=PlotlyFigureResponse)
 async def generate_plotly_figure(
-    cache_data: dict = Depends(requires_cache(["df", "question", "sql"]))
+    cache_data: dict = Depends(requires_cache(["df", "question", "sql"])),
+    render: bool = Query(True, description="Rasterize the chart to a JPEG"),
 ) -> PlotlyFigureResponse:
     """
-    Generate Plotly visualization from query results, save as static HTML,
-    and return the URL to the static asset.
+    Generate Plotly visualization from query results, save it as a static
+    image, and return the URL to the static asset. With render=false only the
+    figure JSON is returned and no image is produced.
     """
     try:
         cache = get_cache()
@@ -71,33 +226,14 @@ async def generate_plotly_figure(
         sql = cache_data["sql"]
         question = cache_data["question"]
 
-        code = vanna.generate_plotly_code(
-            question=question,
-            sql=sql,
-            df_metadata="Running df.dtypes gives:\n %s" % df.dtypes,
-        )
-
-        fig = vanna.get_plotly_figure(plotly_code=code, df=df, dark_mode=False)
-        fig_json = fig.to_json()
-
-        os.makedirs(settings.static_folder, exist_ok=True)
+        fig_json, chart_url = await chart_result(question, sql, df, render)
+        await run_in_threadpool(cache.set, id=id, field="fig_json", value=fig_json)
 
-        unique_chart_id = str(uuid.uuid4())
-        chart_filename = "vanna_chart_%s.jpg" % unique_chart_id
-        chart_file_path = os.path.join(settings.static_folder, chart_filename)
-
-        fig.write_image(
-            chart_file_path,
-            format="jpg",
-            width=1200,
-            height=800,
-            scale=2,
-        )
-
-        chart_url = urljoin(settings.app_url, chart_file_path.replace("\\", "/"))
-        cache.set(id=id, field="fig_json", value=fig_json)
-        cache.set(id=id, field="chart_url", value=chart_url)
+        if chart_url is None:
+            return PlotlyFigureResponse(id=id, fig_json=fig_json)
 
+        await run_in_threadpool(cache.set, id=id, field="chart_url", value=chart_url)
+        get_janitor().track(id, chart_url)
         return PlotlyFigureResponse(id=id, chart_url=chart_url)
 
     except Exception as e:
@@ -107,7 +243,10 @@ async def generate_plotly_figure(
 @router.get("/load_question", response_model=QuestionCacheResponse)
 async def load_question(
     cache_data: dict = Depends(
-        requires_cache(["question", "sql", "df", "fig_json", "followup_questions"])
+        requires_cache(
+            ["question", "sql", "df", "fig_json", "followup_questions"],
+            arrow=["df"],
+        )
     )
 ):
     """Load complete question data from cache."""
@@ -116,9 +255,54 @@ async def load_question(
             id=cache_data["id"],
             question=cache_data["question"],
             sql=cache_data["sql"],
-            df=cache_data["df"].head(10).to_json(orient="records"),
+            df=head(cache_data["df"], 10).to_json(orient="records"),
             fig=cache_data["fig_json"],
             followup_questions=cache_data["followup_questions"],
         )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+
+def _ndjson(columns, batches):
+    """Encode row batches as NDJSON, one chunk per batch."""
+    yield json.dumps({"columns": columns}) + "\n"
+
+    for rows in batches:
+        yield "".join(json.dumps(list(row), default=str) + "\n" for row in rows)
+
+
+def _cached_page(id: str, offset: int, limit: int):
+    """
+    Slice a page from the cached result, reading a spilled result from its
+    memory-mapped Arrow file. Returns None when the result is not cached.
+    """
+    df = get_cache().get_arrow(id=id, field="df")
+    if df is None:
+        return None
+
+    if isinstance(df, pa.Table):
+        total, page = df.num_rows, df.slice(offset, limit).to_pandas()
+    else:
+        total, page = len(df), df.iloc[offset : offset + limit]
+
+    columns = [str(column) for column in page.columns]
+    rows = json.loads(page.to_json(orient="values", date_format="iso"))
+    return columns, rows, offset + limit < total
+
+
+def _arrow_page(columns, rows):
+    """Encode a page of rows as an Arrow IPC stream."""
+    arrays = []
+    for values in zip(*rows) if rows else ([] for _ in columns):
+        try:
+            arrays.append(pa.array(values))
+        except (pa.ArrowException, TypeError):
+            # SQLite columns may mix types; fall back to strings.
+            arrays.append(pa.array([None if v is None else str(v) for v in values]))
+
+    table = pa.Table.from_arrays(arrays, names=columns)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+
+    return sink.getvalue().to_pybytes()
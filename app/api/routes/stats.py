@@ -0,0 +1,38 @@
+from fastapi import APIRouter, HTTPException
+from app.models.responses import StatsResponse
+from app.services.cache_service import get_cache
+from app.services.answer_cache_service import get_answer_cache
+from app.services.result_cache_service import get_result_cache
+from app.services.plotly_cache_service import get_plotly_cache
+from app.services.embedding_cache_service import get_embedding_cache
+from app.services.executor_service import executors
+from app.services.singleflight_service import flights
+from app.services.database_service import get_pool
+from app.services.chart_service import get_renderer, get_janitor
+from app.services.schema_service import get_watcher
+
+router = APIRouter(prefix="/api", tags=["stats"])
+
+
+@router.get("/stats", response_model=StatsResponse)
+async def get_stats():
+    """Get cache hit/miss counters and executor queue depths."""
+    try:
+        cache = get_cache()
+        answer_cache = get_answer_cache()
+        result_cache = get_result_cache()
+        return StatsResponse(
+            cache=cache.stats(),
+            answer_cache=answer_cache.stats(),
+            result_cache=result_cache.stats(),
+            plotly_cache=get_plotly_cache().stats(),
+            embedding_cache=get_embedding_cache().stats(),
+            executors={name: pool.stats() for name, pool in executors.items()},
+            singleflight={name: flight.stats() for name, flight in flights.items()},
+            sqlite_pool=get_pool().stats(),
+            charts=get_renderer().stats(),
+            static_folder=get_janitor().stats(),
+            schema=get_watcher().stats(),
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
@@ -1,7 +1,21 @@
-from fastapi import APIRouter, HTTPException
+import os
+import json
+import time
+from typing import Dict, Iterator, List, Optional
+from fastapi import APIRouter, HTTPException, File, Query, UploadFile
+from fastapi.responses import StreamingResponse
+from app.config import settings
 from app.services.vanna_service import vanna
+from app.services.answer_cache_service import get_answer_cache
+from app.services.executor_service import get_executor
+from app.services.training_service import add_batch, next_batch, read_items
+from app.services.schema_service import get_watcher
 from app.models.requests import TrainingDataRequest, RemoveTrainingDataRequest
-from app.models.responses import TrainingDataResponse, SuccessResponse
+from app.models.responses import (
+    TrainingDataResponse,
+    SuccessResponse,
+    SchemaSyncResponse,
+)
 
 router = APIRouter(prefix="/api", tags=["training"])
 
@@ -10,12 +24,15 @@ router = APIRouter(prefix="/api", tags=["training"])
 async def add_training_data(request: TrainingDataRequest):
     """Add new training data to improve model performance."""
     try:
-        id = vanna.train(
+        training = get_executor("training")
+        id = await training.run(
+            vanna.train,
             question=request.question,
             sql=request.sql,
             ddl=request.ddl,
             documentation=request.documentation,
         )
+        get_answer_cache().clear()
         return TrainingDataResponse(id=id)
     except Exception as e:
         print("TRAINING ERROR", e)
@@ -26,9 +43,95 @@ async def add_training_data(request: TrainingDataRequest):
 async def remove_training_data(request: RemoveTrainingDataRequest):
     """Remove training data by ID."""
     try:
-        if vanna.remove_training_data(id=request.id):
+        training = get_executor("training")
+        if await training.run(vanna.remove_training_data, id=request.id):
+            get_answer_cache().clear()
             return SuccessResponse(success=True)
         else:
             raise HTTPException(status_code=400, detail="Couldn't remove training data")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/sync_schema", response_model=SchemaSyncResponse)
+async def sync_schema(
+    prune_untagged: bool = Query(
+        False, description="Also remove stale DDL the sync did not add"
+    )
+):
+    """Embed new or changed DDL from the database and remove stale DDL."""
+    try:
+        training = get_executor("training")
+        result = await training.run(get_watcher().sync, prune_untagged)
+        return SchemaSyncResponse(**result)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/train/bulk")
+async def add_training_data_bulk(
+    items: List[TrainingDataRequest],
+    batch_size: Optional[int] = Query(None, ge=1, description="Items per batch"),
+):
+    """
+    Add many training items at once, embedding and inserting them in batches.
+    Progress is streamed as NDJSON, one line per batch and a final done line.
+    """
+    items = iter([item.model_dump() for item in items])
+    return StreamingResponse(
+        _train_batches(items, batch_size or settings.training_batch_size),
+        media_type="application/x-ndjson",
+    )
+
+
+@router.post("/train/upload")
+async def add_training_data_upload(
+    file: UploadFile = File(..., description="CSV or JSONL training items"),
+    batch_size: Optional[int] = Query(None, ge=1, description="Items per batch"),
+):
+    """
+    Add training items from an uploaded CSV (question;answer, or sql, ddl and
+    documentation columns) or JSONL file, streamed and inserted in batches.
+    Progress is streamed as NDJSON, one line per batch and a final done line.
+    """
+    # The upload is closed once this handler returns, before the response
+    # streams, so read it through a duplicate of its file descriptor.
+    file.file.rollover()
+    upload = os.fdopen(os.dup(file.file.fileno()), "rb")
+    upload.seek(0)
+
+    items = read_items(upload, file.filename or "")
+    return StreamingResponse(
+        _train_batches(items, batch_size or settings.training_batch_size, upload),
+        media_type="application/x-ndjson",
+    )
+
+
+async def _train_batches(items: Iterator[Dict], batch_size: int, file=None):
+    """Insert items batch by batch on the training executor, yielding progress."""
+    training = get_executor("training")
+    totals = {"processed": 0, "sql": 0, "ddl": 0, "documentation": 0, "skipped": 0}
+    started = time.perf_counter()
+
+    try:
+        while batch := await training.run(next_batch, items, batch_size):
+            counts = await training.run(add_batch, batch)
+            totals["processed"] += len(batch)
+            for kind, count in counts.items():
+                totals[kind] += count
+
+            elapsed = round(time.perf_counter() - started, 3)
+            yield json.dumps({"type": "progress", **totals, "elapsed": elapsed}) + "\n"
+
+    except Exception as e:
+        yield json.dumps({"type": "error", "error": str(e), **totals}) + "\n"
+        return
+
+    finally:
+        if totals["processed"]:
+            get_answer_cache().clear()
+        if file is not None:
+            file.close()
+
+    elapsed = round(time.perf_counter() - started, 3)
+    yield json.dumps({"type": "done", **totals, "elapsed": elapsed}) + "\n"
@@ -8,6 +8,7 @@ load_dotenv()
 class Settings(BaseSettings):
     debug: bool = True
     port: int = 4321
+    workers: int = 1
 
     app_version: str = "1.0.0"
     app_title: str = "Vanna SQL Assistant"
@@ -15,9 +16,55 @@ class Settings(BaseSettings):
     origin_url: str = "http://localhost:8000"
 
     model_name: str
+    ollama_host: str = "http://localhost:11434"
+    embedding_model: Optional[str] = None
     sqlite_path: Optional[str]
+    sqlite_pool_size: int = 4
+    sqlite_query_timeout: Optional[float] = 30.0
+    sqlite_stream_timeout: Optional[float] = 600.0
+    sqlite_stream_limit: int = 8
+    sqlite_mmap_size: int = 268435456
+    sqlite_cache_size: int = 65536
+    sqlite_wal: bool = True
     chroma_folder: Optional[str]
     static_folder: str = "static"
+    preview_rows: int = 100
+    export_chunk_rows: int = 10000
+    digest_token_budget: int = 1500
+    digest_top_k: int = 5
+    sql_prompt_token_budget: int = 1200
+
+    cache_backend: str = "memory"
+    cache_path: str = "cache.sqlite"
+    history_path: str = "history.sqlite"
+    cache_max_entries: Optional[int] = None
+    cache_max_bytes: Optional[int] = None
+    cache_ttl: Optional[int] = None
+    cache_spill_bytes: Optional[int] = None
+    spill_folder: str = "spill"
+
+    answer_cache_size: int = 1000
+    answer_cache_threshold: float = 0.97
+
+    result_cache_size: int = 256
+    result_cache_max_bytes: int = 268435456
+
+    plotly_cache_size: int = 512
+    embedding_cache_size: int = 1024
+
+    llm_workers: int = 2
+    sql_workers: int = 4
+    render_workers: int = 2
+    training_workers: int = 1
+    retrieval_workers: int = 6
+    training_batch_size: int = 256
+    schema_sync_interval: int = 60
+    render_timeout: float = 90
+    slow_request_seconds: float = 10.0
+
+    chart_max_age: Optional[int] = 604800
+    chart_max_bytes: Optional[int] = 1073741824
+    chart_sweep_interval: int = 300
 
     class Config:
         env_file = ".env"
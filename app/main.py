@@ -1,4 +1,6 @@
+import asyncio
 from typing import Dict
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
 
 from fastapi import FastAPI
@@ -6,16 +8,34 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 
 from app.config import settings
-from app.api.routes import questions, sql, data, training
+from app.api.routes import questions, sql, data, training, stats, ask, metrics
+from app.services.executor_service import shutdown_executors
+from app.services.chart_service import get_renderer, get_janitor
+from app.services.schema_service import get_watcher
+from app.services.metrics_service import TraceMiddleware, shutdown_metrics
 
 load_dotenv()
 
 origins = ["http://localhost", settings.origin_url]
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    janitor = asyncio.create_task(get_janitor().run())
+    watcher = asyncio.create_task(get_watcher().run())
+    yield
+    janitor.cancel()
+    watcher.cancel()
+    shutdown_executors()
+    get_renderer().stop()
+    shutdown_metrics()
+
+
 app = FastAPI(
     title=settings.app_title,
     version=settings.app_version,
     debug=settings.debug,
+    lifespan=lifespan,
 )
 
 app.add_middleware(
@@ -24,12 +44,17 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Trace-Id"],
 )
+app.add_middleware(TraceMiddleware, slow_seconds=settings.slow_request_seconds)
 
 app.include_router(sql.router)
 app.include_router(data.router)
 app.include_router(training.router)
 app.include_router(questions.router)
+app.include_router(stats.router)
+app.include_router(ask.router)
+app.include_router(metrics.router)
 app.mount("/static", StaticFiles(directory=settings.static_folder), name="static")
 
 
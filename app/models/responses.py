@@ -5,6 +5,8 @@ from typing import Optional, List, Dict, Any
 class ErrorResponse(BaseModel):
     type: str = "error"
     error: str
+    stage: Optional[str] = None
+    id: Optional[str] = None
 
 
 class QuestionListResponse(BaseModel):
@@ -20,23 +22,56 @@ class SQLResponse(BaseModel):
     text: str
 
 
+class TokenResponse(BaseModel):
+    type: str = "token"
+    id: str
+    text: str
+
+
+class ResetResponse(BaseModel):
+    type: str = "reset"
+    id: str
+
+
 class DataFrameResponse(BaseModel):
     type: str = "df"
     id: str
     df: str  # JSON string
     df_markdown: str
+    row_count: Optional[int] = None
+    digest: Optional[str] = None
+
+
+class DataFramePageResponse(BaseModel):
+    type: str = "df_page"
+    id: str
+    columns: List[str]
+    rows: List[List[Any]]
+    offset: int
+    limit: int
+    next_offset: Optional[int] = None
 
 
 class PlotlyFigureResponse(BaseModel):
     type: str = "plotly_figure"
     id: str
-    chart_url: str
+    chart_url: Optional[str] = None
+    fig_json: Optional[str] = None  # JSON string, set when not rendered
 
 
 class TrainingDataResponse(BaseModel):
     id: str
 
 
+class SchemaSyncResponse(BaseModel):
+    type: str = "schema_sync"
+    schema_version: int
+    added: int
+    adopted: int = 0
+    removed: int
+    unchanged: int
+
+
 class SuccessResponse(BaseModel):
     success: bool
 
@@ -54,3 +89,19 @@ class QuestionCacheResponse(BaseModel):
 class QuestionHistoryResponse(BaseModel):
     type: str = "question_history"
     questions: List[Dict[str, Any]]
+    next_cursor: Optional[int] = None
+
+
+class StatsResponse(BaseModel):
+    type: str = "stats"
+    cache: Dict[str, Any]
+    answer_cache: Dict[str, Any]
+    result_cache: Dict[str, Any]
+    plotly_cache: Dict[str, Any]
+    embedding_cache: Dict[str, Any]
+    executors: Dict[str, Dict[str, Any]]
+    singleflight: Dict[str, Dict[str, Any]]
+    sqlite_pool: Dict[str, Any]
+    charts: Dict[str, Any]
+    static_folder: Dict[str, Any]
+    schema: Dict[str, Any]
@@ -0,0 +1,232 @@
+import os
+import re
+import sqlite3
+import threading
+import numpy as np
+from collections import OrderedDict
+from typing import Callable, Optional, Sequence
+from app.config import settings
+from app.services.vanna_service import vanna
+
+
+def normalize_question(question: str) -> str:
+    """Lowercase a question, drop punctuation and collapse whitespace."""
+    question = re.sub(r"[^\w\s]", " ", question.lower())
+    return " ".join(question.split())
+
+
+class TrainingVersion:
+    """
+    Version of the training data, kept in a SQLite file so every worker
+    process sees the same number. It is bumped whenever training data changes.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.local = threading.local()
+
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS training_version "
+                "(id INTEGER PRIMARY KEY CHECK (id = 0), version INTEGER NOT NULL)"
+            )
+            conn.execute("INSERT OR IGNORE INTO training_version VALUES (0, 0)")
+
+    def get(self) -> int:
+        """Return the current version."""
+        row = self._connect().execute("SELECT version FROM training_version")
+        return row.fetchone()[0]
+
+    def bump(self):
+        """Move to a new version."""
+        with self._connect() as conn:
+            conn.execute("UPDATE training_version SET version = version + 1")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            self.local.conn = conn
+
+        return conn
+
+
+class AnswerCache:
+    """
+    Question to SQL cache consulted before asking the LLM.
+
+    Questions match exactly after normalize_question, or by cosine similarity
+    of their embeddings at or above threshold. Near-duplicates must also
+    mention the same numbers, so "top 5" never reuses the SQL for "top 10".
+    Entries are evicted least recently used first. Every entry belongs to the
+    training data version it was generated from; when any worker changes the
+    training data the version moves on, and each worker drops its entries on
+    its next lookup.
+    """
+
+    def __init__(
+        self,
+        embed: Callable[[str], Sequence[float]],
+        version: Optional[TrainingVersion] = None,
+        max_entries: int = 1000,
+        threshold: float = 0.97,
+    ):
+        self.embed = embed
+        self.version = version
+        self.current = None
+        self.max_entries = max_entries
+        self.threshold = threshold
+        self.entries = OrderedDict()
+        self.embeddings = OrderedDict()
+        self.recent = OrderedDict()
+        self.matrix = None
+        self.keys = []
+        self.exact_hits = 0
+        self.similar_hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def lookup(self, question: str) -> Optional[str]:
+        """Return cached SQL for a question, or None on a miss."""
+        key = normalize_question(question)
+        version = self.training_version()
+
+        with self.lock:
+            self._check_version(version)
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.exact_hits += 1
+                return self.entries[key]
+
+            if self.threshold > 1 or not self.entries:
+                self.misses += 1
+                return None
+
+        embedding = self._embedding(question, key)
+
+        with self.lock:
+            match = self._most_similar(embedding)
+            if match is None or not self._same_numbers(key, match):
+                self.misses += 1
+                return None
+
+            self.entries.move_to_end(match)
+            self.similar_hits += 1
+            return self.entries[match]
+
+    def put(self, question: str, sql: str, version: Optional[int] = None):
+        """
+        Store the SQL generated for a question from the given training data
+        version. Answers from an older version are dropped.
+        """
+        if self.max_entries <= 0:
+            return
+
+        key = normalize_question(question)
+        embedding = self._embedding(question, key) if self.threshold <= 1 else None
+
+        with self.lock:
+            self._check_version(self.training_version())
+            if version != self.current:
+                return
+
+            self.entries[key] = sql
+            self.entries.move_to_end(key)
+            if embedding is not None:
+                self.embeddings[key] = embedding
+
+            while len(self.entries) > self.max_entries:
+                oldest, _ = self.entries.popitem(last=False)
+                self.embeddings.pop(oldest, None)
+
+            self.matrix = None
+
+    def clear(self):
+        """Drop every cached answer, in this and every other worker."""
+        if self.version is not None:
+            self.version.bump()
+
+        with self.lock:
+            self._clear()
+
+    def training_version(self) -> Optional[int]:
+        """Return the training data version answers are generated from."""
+        return self.version.get() if self.version is not None else None
+
+    def stats(self) -> dict:
+        """Return size and hit/miss counters."""
+        with self.lock:
+            hits = self.exact_hits + self.similar_hits
+            lookups = hits + self.misses
+            return {
+                "entries": len(self.entries),
+                "max_entries": self.max_entries,
+                "threshold": self.threshold,
+                "training_version": self.current,
+                "exact_hits": self.exact_hits,
+                "similar_hits": self.similar_hits,
+                "misses": self.misses,
+                "hit_ratio": hits / lookups if lookups else 0.0,
+            }
+
+    def _check_version(self, version: Optional[int]):
+        if version != self.current:
+            self._clear()
+            self.current = version
+
+    def _clear(self):
+        self.entries.clear()
+        self.embeddings.clear()
+        self.recent.clear()
+        self.matrix = None
+
+    def _embedding(self, question: str, key: str) -> np.ndarray:
+        with self.lock:
+            if key in self.embeddings:
+                return self.embeddings[key]
+
+            if key in self.recent:
+                return self.recent[key]
+
+        embedding = np.asarray(self.embed(question), dtype=np.float32)
+        norm = np.linalg.norm(embedding)
+        embedding = embedding / norm if norm else embedding
+
+        # Remember embeddings from recent misses so the put() that follows a
+        # lookup() does not embed the same question twice.
+        with self.lock:
+            self.recent[key] = embedding
+            while len(self.recent) > 64:
+                self.recent.popitem(last=False)
+
+        return embedding
+
+    def _most_similar(self, embedding: np.ndarray) -> Optional[str]:
+        if not self.embeddings:
+            return None
+
+        if self.matrix is None:
+            self.keys = list(self.embeddings)
+            self.matrix = np.vstack([self.embeddings[key] for key in self.keys])
+
+        scores = self.matrix @ embedding
+        best = int(np.argmax(scores))
+        return self.keys[best] if scores[best] >= self.threshold else None
+
+    @staticmethod
+    def _same_numbers(a: str, b: str) -> bool:
+        return re.findall(r"\d+", a) == re.findall(r"\d+", b)
+
+
+answer_cache = AnswerCache(
+    embed=vanna.question_embedding,
+    # Next to the training data it versions, shared by every worker.
+    version=TrainingVersion(os.path.join(settings.chroma_folder, "version.sqlite")),
+    max_entries=settings.answer_cache_size,
+    threshold=settings.answer_cache_threshold,
+)
+
+
+def get_answer_cache():
+    """Get answer cache instance."""
+    return answer_cache
@@ -1,6 +1,34 @@
-from cache import MemoryCache
+from cache import Cache, MemoryCache, SQLiteCache
+from app.config import settings
+from app.services.chart_service import get_janitor
 
-cache = MemoryCache()
+
+def create_cache() -> Cache:
+    """Create the cache backend selected by settings.cache_backend."""
+    if settings.cache_backend == "memory":
+        return MemoryCache(
+            max_entries=settings.cache_max_entries,
+            max_bytes=settings.cache_max_bytes,
+            ttl=settings.cache_ttl,
+            spill_bytes=settings.cache_spill_bytes,
+            spill_folder=settings.spill_folder,
+            on_evict=get_janitor().release,
+        )
+
+    if settings.cache_backend == "sqlite":
+        return SQLiteCache(
+            path=settings.cache_path,
+            max_entries=settings.cache_max_entries,
+            max_bytes=settings.cache_max_bytes,
+            ttl=settings.cache_ttl,
+            on_evict=get_janitor().release,
+        )
+
+    raise ValueError(f"Unknown cache backend: {settings.cache_backend}")
+
+
+cache = create_cache()
+get_janitor().watch(cache)
 
 
 def get_cache():
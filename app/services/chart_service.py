@@ -0,0 +1,332 @@
+import asyncio
+import hashlib
+import logging
+import os
+import threading
+import time
+import uuid
+import kaleido
+from typing import Optional, Tuple
+from urllib.parse import urljoin, urlparse
+from starlette.concurrency import run_in_threadpool
+from app.config import settings
+from app.services.metrics_service import timed
+
+logger = logging.getLogger(__name__)
+
+CHART_PREFIX = "vanna_chart_"
+CHART_OPTIONS = {"format": "jpg", "width": 1200, "height": 800, "scale": 2}
+# Extra seconds to wait for a render beyond Kaleido's own timeout.
+RENDER_MARGIN = 10
+
+
+class ChartRenderer:
+    """
+    Warm Kaleido renderer shared by the render executor threads.
+
+    plotly's write_image starts a new headless Chrome for every image. This
+    keeps one Kaleido browser with one tab per render worker open on a
+    background event loop, and renders figures on it from any thread. The
+    browser is started on the first render.
+    """
+
+    def __init__(self, tabs: int = 1, timeout: float = 90):
+        self.tabs = tabs
+        self.timeout = timeout
+        self.loop = None
+        self.kaleido = None
+        self.rendered = 0
+        self.reused = 0
+        self.failed = 0
+        self.lock = threading.Lock()
+
+    def image(self, fig_dict: dict, **options) -> bytes:
+        """
+        Render a figure dict to image bytes. Kaleido only returns a tab to
+        its pool when a render succeeds, and a crashed Chrome never recovers,
+        so after a failed or timed out render the browser is closed and the
+        next render opens a new one.
+        """
+        browser, loop = self._start()
+        future = asyncio.run_coroutine_threadsafe(
+            browser.calc_fig(fig_dict, opts=options), loop
+        )
+        try:
+            return future.result(timeout=self.timeout + RENDER_MARGIN)
+        except Exception:
+            future.cancel()
+            self.failed += 1
+            self._close(browser)
+            raise
+
+    def stop(self):
+        """Close the browser and its event loop."""
+        with self.lock:
+            browser = self.kaleido
+        if browser is not None:
+            self._close(browser)
+
+    def stats(self) -> dict:
+        """Return render counts and whether the browser is running."""
+        return {
+            "running": self.kaleido is not None,
+            "tabs": self.tabs,
+            "rendered": self.rendered,
+            "reused": self.reused,
+            "failed": self.failed,
+        }
+
+    def _start(self) -> Tuple["kaleido.Kaleido", asyncio.AbstractEventLoop]:
+        with self.lock:
+            if self.kaleido is not None:
+                return self.kaleido, self.loop
+
+            loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=loop.run_forever, name="kaleido")
+            thread.daemon = True
+            thread.start()
+
+            try:
+                self.kaleido = asyncio.run_coroutine_threadsafe(
+                    self._open(), loop
+                ).result(timeout=self.timeout)
+            except Exception:
+                loop.call_soon_threadsafe(loop.stop)
+                raise
+
+            self.loop = loop
+            return self.kaleido, self.loop
+
+    def _close(self, browser):
+        """Close a browser and its loop, unless it was already replaced."""
+        with self.lock:
+            if self.kaleido is not browser:
+                return
+
+            loop = self.loop
+            self.kaleido = None
+            self.loop = None
+
+        future = asyncio.run_coroutine_threadsafe(browser.close(), loop)
+        try:
+            future.result(timeout=10)
+        except Exception:
+            logger.warning("Kaleido browser did not close cleanly", exc_info=True)
+        finally:
+            loop.call_soon_threadsafe(loop.stop)
+
+    async def _open(self):
+        browser = kaleido.Kaleido(n=self.tabs, timeout=self.timeout)
+        await browser.open()
+        return browser
+
+
+class ChartJanitor:
+    """
+    Retention policy for chart images in the static folder.
+
+    Charts are referenced by cache entries; when the last entry referencing a
+    chart is evicted, the file is deleted. A periodic sweep also deletes
+    charts last used more than max_age seconds ago, referenced or not, since
+    a missing chart is rendered again when it is next asked for, then the
+    least recently used unreferenced charts until the folder holds at most
+    max_bytes of them. Once watch() is given the cache, references are read
+    from its chart_url fields, so entries made by other workers sharing it
+    count too.
+    """
+
+    def __init__(
+        self,
+        folder: str,
+        max_age: Optional[float] = None,
+        max_bytes: Optional[int] = None,
+        interval: float = 300,
+    ):
+        self.folder = folder
+        self.max_age = max_age
+        self.max_bytes = max_bytes
+        self.interval = interval
+        self.cache = None
+        self.refs = {}
+        self.charts = {}
+        self.deleted = 0
+        self.reclaimed_bytes = 0
+        self.sweeps = 0
+        self.files = 0
+        self.total_bytes = 0
+        self.lock = threading.Lock()
+
+    def watch(self, cache):
+        """Check chart references against a cache shared with other workers."""
+        self.cache = cache
+
+    def track(self, id: str, chart_url: str):
+        """Record that the cache entry id references a chart."""
+        filename = os.path.basename(urlparse(chart_url).path)
+        with self.lock:
+            self.charts.setdefault(id, set()).add(filename)
+            self.refs.setdefault(filename, set()).add(id)
+
+    def release(self, id: str):
+        """Forget an evicted cache entry and delete charts nobody references."""
+        orphans = []
+        with self.lock:
+            for filename in self.charts.pop(id, ()):
+                ids = self.refs.get(filename, set())
+                ids.discard(id)
+                if not ids:
+                    self.refs.pop(filename, None)
+                    orphans.append(filename)
+
+        if orphans and self.cache is not None:
+            referenced = self._referenced()
+            orphans = [filename for filename in orphans if filename not in referenced]
+
+        for filename in orphans:
+            self._delete(os.path.join(self.folder, filename))
+
+    def sweep(self):
+        """Apply the age and size limits to the static folder."""
+        now = time.time()
+        charts = []
+        for entry in self._scan():
+            stat = entry.stat()
+            if entry.name.endswith(".tmp"):
+                if now - stat.st_mtime > 3600:
+                    self._delete(entry.path, stat.st_size)
+                continue
+
+            charts.append((stat.st_mtime, stat.st_size, entry.name, entry.path))
+
+        charts.sort()
+        referenced = self._referenced()
+
+        total_bytes = sum(size for _, size, _, _ in charts)
+        kept = []
+        for mtime, size, name, path in charts:
+            expired = self.max_age is not None and now - mtime > self.max_age
+            over = self.max_bytes is not None and total_bytes > self.max_bytes
+            if expired or (over and name not in referenced):
+                self._delete(path, size)
+                total_bytes -= size
+            else:
+                kept.append(size)
+
+        self.files = len(kept)
+        self.total_bytes = sum(kept)
+        self.sweeps += 1
+
+    async def run(self):
+        """Sweep the static folder every interval seconds until cancelled."""
+        while True:
+            try:
+                await run_in_threadpool(self.sweep)
+            except Exception:
+                logger.exception("Chart sweep failed")
+
+            await asyncio.sleep(self.interval)
+
+    def stats(self) -> dict:
+        """Return folder size, deletions and bytes reclaimed."""
+        with self.lock:
+            referenced = len(self.refs)
+
+        return {
+            "files": self.files,
+            "bytes": self.total_bytes,
+            "referenced": referenced,
+            "max_age": self.max_age,
+            "max_bytes": self.max_bytes,
+            "sweeps": self.sweeps,
+            "deleted": self.deleted,
+            "reclaimed_bytes": self.reclaimed_bytes,
+        }
+
+    def _referenced(self) -> set:
+        """Return the filenames of charts referenced by cache entries."""
+        if self.cache is None:
+            with self.lock:
+                return set(self.refs)
+
+        return {
+            os.path.basename(urlparse(entry["chart_url"]).path)
+            for entry in self.cache.get_all(["chart_url"])
+            if entry["chart_url"]
+        }
+
+    def _scan(self):
+        try:
+            with os.scandir(self.folder) as entries:
+                return [
+                    entry
+                    for entry in entries
+                    if entry.name.startswith(CHART_PREFIX) and entry.is_file()
+                ]
+        except FileNotFoundError:
+            return []
+
+    def _delete(self, path: str, size: Optional[int] = None):
+        try:
+            if size is None:
+                size = os.path.getsize(path)
+            os.remove(path)
+        except OSError:
+            return
+
+        with self.lock:
+            self.deleted += 1
+            self.reclaimed_bytes += size
+
+
+renderer = ChartRenderer(tabs=settings.render_workers, timeout=settings.render_timeout)
+janitor = ChartJanitor(
+    settings.static_folder,
+    max_age=settings.chart_max_age,
+    max_bytes=settings.chart_max_bytes,
+    interval=settings.chart_sweep_interval,
+)
+
+
+def get_renderer() -> ChartRenderer:
+    """Get the chart renderer."""
+    return renderer
+
+
+def get_janitor() -> ChartJanitor:
+    """Get the static folder janitor."""
+    return janitor
+
+
+def chart_filename(fig_json: str) -> str:
+    """Name a chart file after a hash of its figure JSON and render options."""
+    key = "%s|%s" % (sorted(CHART_OPTIONS.items()), fig_json)
+    digest = hashlib.sha256(key.encode("utf-8")).hexdigest()[:32]
+    return "%s%s.%s" % (CHART_PREFIX, digest, CHART_OPTIONS["format"])
+
+
+def render_chart(fig) -> Tuple[str, str]:
+    """
+    Save a figure as a JPEG in the static folder and return its JSON and URL.
+    Identical figures map to the same file, which is only rendered once.
+    """
+    fig_json = fig.to_json()
+
+    os.makedirs(settings.static_folder, exist_ok=True)
+    chart_file_path = os.path.join(settings.static_folder, chart_filename(fig_json))
+
+    if os.path.exists(chart_file_path):
+        # Refresh the mtime so the janitor sees when the chart was last used.
+        os.utime(chart_file_path)
+        renderer.reused += 1
+    else:
+        with timed("render"):
+            data = renderer.image(fig.to_dict(), **CHART_OPTIONS)
+
+        temp_path = "%s.%s.tmp" % (chart_file_path, uuid.uuid4())
+        with open(temp_path, "wb") as f:
+            f.write(data)
+        os.replace(temp_path, chart_file_path)
+        renderer.rendered += 1
+
+    chart_url = urljoin(settings.app_url, chart_file_path.replace("\\", "/"))
+    return fig_json, chart_url
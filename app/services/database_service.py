@@ -0,0 +1,311 @@
+import os
+import queue
+import sqlite3
+import threading
+import time
+import weakref
+import pandas as pd
+from contextlib import contextmanager
+from typing import Iterator, List, Optional, Tuple
+from app.config import settings
+from app.services.metrics_service import timed
+
+
+class StreamLimitError(RuntimeError):
+    """Raised when stream_limit streamed reads are already open."""
+
+
+class SQLitePool:
+    """
+    Pool of read-only SQLite connections shared by query execution threads.
+
+    Connections are opened lazily up to size and tuned for reads: query_only,
+    a memory-mapped I/O window and a larger page cache. The database is
+    switched to WAL once so readers never wait on a writer. Every query runs
+    under a time budget enforced by a progress handler, which interrupts
+    statements that run past their deadline.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        size: int = 4,
+        query_timeout: Optional[float] = 30.0,
+        stream_timeout: Optional[float] = 600.0,
+        stream_limit: int = 8,
+        mmap_size: int = 256 * 1024 * 1024,
+        cache_size: int = 64 * 1024,
+        wal: bool = True,
+    ):
+        self.path = os.path.abspath(path)
+        self.size = size
+        self.query_timeout = query_timeout
+        self.stream_timeout = stream_timeout
+        self.stream_limit = stream_limit
+        self.streams = threading.BoundedSemaphore(stream_limit)
+        self.streaming = 0
+        self.mmap_size = mmap_size
+        self.cache_size = cache_size
+        self.idle = queue.LifoQueue()
+        self.opened = 0
+        self.timeouts = 0
+        self.lock = threading.Lock()
+
+        if wal:
+            self._enable_wal()
+
+    def acquire(
+        self, timeout: Optional[float] = None
+    ) -> Tuple[sqlite3.Connection, "Deadline"]:
+        """Take a connection out of the pool with a fresh query deadline."""
+        conn = self._checkout()
+        deadline = Deadline(self.query_timeout if timeout is None else timeout)
+        conn.set_progress_handler(deadline.expired, 1000)
+        return conn, deadline
+
+    def open_stream(self) -> Tuple[sqlite3.Connection, "Deadline"]:
+        """
+        Open a connection outside the pool for a streamed read, so slow clients
+        never hold pooled connections. The deadline's budget restarts for each
+        batch but the whole stream ends after stream_timeout seconds. At most
+        stream_limit streams are open at once; past that StreamLimitError is
+        raised. The caller passes the connection to close_stream when done.
+        """
+        if not self.streams.acquire(blocking=False):
+            raise StreamLimitError(
+                f"{self.stream_limit} result streams are already open"
+            )
+
+        try:
+            conn = self._open()
+        except Exception:
+            self.streams.release()
+            raise
+
+        with self.lock:
+            self.streaming += 1
+        deadline = Deadline(self.query_timeout, total=self.stream_timeout)
+        conn.set_progress_handler(deadline.expired, 1000)
+        return conn, deadline
+
+    def close_stream(self, conn: sqlite3.Connection):
+        """Close a connection taken with open_stream()."""
+        try:
+            conn.close()
+        finally:
+            with self.lock:
+                self.streaming -= 1
+            self.streams.release()
+
+    def release(self, conn: sqlite3.Connection):
+        """Return a connection taken with acquire()."""
+        conn.set_progress_handler(None, 0)
+        self.idle.put(conn)
+
+    def check_timeout(self, deadline: "Deadline", error: BaseException):
+        """Raise TimeoutError if error is SQLite interrupting a late query."""
+        if isinstance(error, sqlite3.Error) and deadline.passed:
+            with self.lock:
+                self.timeouts += 1
+            raise TimeoutError(deadline.message()) from error
+
+    @contextmanager
+    def connection(self, timeout: Optional[float] = None):
+        """Borrow a connection, interrupting statements after timeout seconds."""
+        conn, deadline = self.acquire(timeout)
+        try:
+            yield conn
+        except Exception as e:
+            self.check_timeout(deadline, e)
+            raise
+        finally:
+            self.release(conn)
+
+    def run_sql(self, sql: str) -> pd.DataFrame:
+        """Run a query on a pooled connection and return its result."""
+        with timed("sql"), self.connection() as conn:
+            try:
+                return pd.read_sql_query(sql, conn)
+            except pd.errors.DatabaseError as e:
+                # pandas wraps sqlite3 errors; unwrap them so timeouts are seen.
+                if isinstance(e.__cause__, sqlite3.Error):
+                    raise e.__cause__
+                raise
+
+    def stats(self) -> dict:
+        """Return pool size, idle connections, open streams and timed-out queries."""
+        with self.lock:
+            return {
+                "size": self.size,
+                "opened": self.opened,
+                "idle": self.idle.qsize(),
+                "streaming": self.streaming,
+                "timeouts": self.timeouts,
+            }
+
+    def _checkout(self) -> sqlite3.Connection:
+        try:
+            return self.idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self.lock:
+            if self.opened < self.size:
+                self.opened += 1
+                return self._open()
+
+        try:
+            return self.idle.get(timeout=self.query_timeout)
+        except queue.Empty:
+            raise TimeoutError("No database connection became available")
+
+    def _open(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            f"file:{self.path}?mode=rw", uri=True, check_same_thread=False
+        )
+        conn.execute("PRAGMA query_only=ON")
+        conn.execute(f"PRAGMA mmap_size={int(self.mmap_size)}")
+        conn.execute(f"PRAGMA cache_size=-{int(self.cache_size)}")
+        return conn
+
+    def _enable_wal(self):
+        try:
+            conn = sqlite3.connect(f"file:{self.path}?mode=rw", uri=True)
+            try:
+                conn.execute("PRAGMA journal_mode=WAL")
+            finally:
+                conn.close()
+        except sqlite3.Error:
+            pass
+
+
+class Deadline:
+    """
+    Per-query time budget checked from a SQLite progress handler, optionally
+    within a total budget that extending does not restart.
+    """
+
+    def __init__(self, budget: Optional[float], total: Optional[float] = None):
+        self.budget = budget
+        self.total = total
+        self.end = None if total is None else time.monotonic() + total
+        self.passed = False
+        self.extend()
+
+    def extend(self):
+        """Restart the budget, e.g. before fetching the next batch of a stream."""
+        at = None if self.budget is None else time.monotonic() + self.budget
+        if self.end is not None:
+            at = self.end if at is None else min(at, self.end)
+        self.at = at
+
+    @property
+    def ended(self) -> bool:
+        """Whether the total budget is used up."""
+        return self.end is not None and time.monotonic() > self.end
+
+    def message(self) -> str:
+        if self.ended:
+            return f"Stream exceeded its {self.total}s time budget"
+        return f"Query exceeded its {self.budget}s time budget"
+
+    def expired(self) -> int:
+        if self.at is not None and time.monotonic() > self.at:
+            self.passed = True
+            return 1
+
+        return 0
+
+
+pool = SQLitePool(
+    settings.sqlite_path,
+    size=settings.sqlite_pool_size,
+    query_timeout=settings.sqlite_query_timeout,
+    stream_timeout=settings.sqlite_stream_timeout,
+    stream_limit=settings.sqlite_stream_limit,
+    mmap_size=settings.sqlite_mmap_size,
+    cache_size=settings.sqlite_cache_size,
+    wal=settings.sqlite_wal,
+)
+
+
+def get_pool() -> SQLitePool:
+    """Get the SQLite connection pool."""
+    return pool
+
+
+def fetch_page(sql: str, offset: int, limit: int) -> Tuple[List[str], list, bool]:
+    """
+    Fetch one page of a query's rows.
+
+    Returns the column names, up to limit rows starting at offset, and whether
+    more rows follow. The query must be a single read-only statement since it
+    is wrapped in an outer LIMIT/OFFSET.
+    """
+    with timed("sql"), pool.connection() as conn:
+        cursor = conn.execute(
+            f"SELECT * FROM ({sql}) LIMIT ? OFFSET ?", (limit + 1, offset)
+        )
+        columns = [column[0] for column in cursor.description]
+        rows = cursor.fetchall()
+        return columns, rows[:limit], len(rows) > limit
+
+
+def iter_batches(
+    sql: str, offset: int = 0, batch_size: int = 1000
+) -> Tuple[List[str], Iterator[list]]:
+    """
+    Execute a query and return its column names and an iterator of row
+    batches read from the cursor, starting at offset.
+
+    The query runs before this returns, so errors surface to the caller rather
+    than in the middle of a streamed response. It runs on its own connection
+    from open_stream, closed when the iterator is exhausted or discarded. The
+    time budget restarts for every batch so a slow client does not count
+    against the query, but the whole stream is cut off after the pool's
+    stream_timeout.
+    """
+    conn, deadline = pool.open_stream()
+    cursor = None
+    closed = []
+
+    def close():
+        if not closed:
+            closed.append(True)
+            if cursor is not None:
+                cursor.close()
+            pool.close_stream(conn)
+
+    try:
+        if offset:
+            cursor = conn.execute(f"SELECT * FROM ({sql}) LIMIT -1 OFFSET ?", (offset,))
+        else:
+            cursor = conn.execute(sql)
+    except Exception as e:
+        close()
+        pool.check_timeout(deadline, e)
+        raise
+
+    columns = [column[0] for column in cursor.description or []]
+
+    def batches():
+        try:
+            while True:
+                if deadline.ended:
+                    raise TimeoutError(deadline.message())
+
+                deadline.extend()
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+
+                yield rows
+        except Exception as e:
+            pool.check_timeout(deadline, e)
+            raise
+        finally:
+            close()
+
+    iterator = batches()
+    weakref.finalize(iterator, close)
+    return columns, iterator
@@ -0,0 +1,164 @@
+import re
+import numpy as np
+import pandas as pd
+from typing import List
+
+TOKEN = re.compile(r"\w+|[^\w\s]")
+MAX_CELL_CHARS = 40
+
+
+def count_tokens(text: str) -> int:
+    """Approximate the LLM token count of text by words and punctuation marks."""
+    return len(TOKEN.findall(text))
+
+
+def build_digest(
+    df: pd.DataFrame,
+    token_budget: int = 1500,
+    top_k: int = 5,
+    preview_rows: int = 20,
+    sample_rows: int = 5,
+) -> str:
+    """
+    Summarize a result as markdown that fits a token budget: its shape, stats
+    for each column, the top groups of the first label column by the first
+    numeric one, a preview of the first rows and a sample of the rest. Sections
+    are added in that order and shrunk or dropped once the budget runs out;
+    column stats take at most half of it so wide results still show rows.
+    """
+    sections = [f"Result: {len(df)} rows, {len(df.columns)} columns."]
+    budget = token_budget - count_tokens(sections[0])
+    if df.empty:
+        columns = ", ".join(str(column) for column in df.columns)
+        return f"{sections[0]}\n\nColumns: {columns}"
+
+    columns = _fit_lines(
+        [_describe_column(df, column) for column in df.columns],
+        budget // 2,
+        "- ... {} more columns",
+    )
+    if columns:
+        sections.append("Columns:\n" + "\n".join(columns))
+        budget -= count_tokens(sections[-1])
+
+    groups = _top_groups(df, top_k)
+    if groups and count_tokens(groups) <= budget:
+        sections.append(groups)
+        budget -= count_tokens(groups)
+
+    preview = df.head(preview_rows)
+    table = _fit_table(preview, budget, f"First {{}} of {len(df)} rows:")
+    if table:
+        sections.append(table)
+        budget -= count_tokens(table)
+
+    rest = df.iloc[len(preview) :]
+    if len(rest) and table:
+        positions = np.linspace(0, len(rest) - 1, min(sample_rows, len(rest)))
+        sample = rest.iloc[np.unique(positions.astype(int))]
+        table = _fit_table(sample, budget, "Sample of {} later rows:")
+        if table:
+            sections.append(table)
+
+    return "\n\n".join(sections)
+
+
+def _describe_column(df: pd.DataFrame, column) -> str:
+    """Describe one column in a single line."""
+    values = df[column]
+    nulls = int(values.isna().sum())
+    line = f"- {column} ({values.dtype})"
+
+    if pd.api.types.is_bool_dtype(values):
+        stats = f"true={int(values.sum())}"
+    elif pd.api.types.is_numeric_dtype(values):
+        stats = "min={}, max={}, mean={}, sum={}".format(
+            *map(_format, (values.min(), values.max(), values.mean(), values.sum()))
+        )
+    elif pd.api.types.is_datetime64_any_dtype(values):
+        stats = f"min={values.min()}, max={values.max()}"
+    else:
+        counts = values.astype(str).value_counts()
+        top = ", ".join(
+            f"{_truncate(value)} ({count})" for value, count in counts.head(3).items()
+        )
+        stats = f"distinct={len(counts)}, top: {top}"
+
+    return f"{line}: {stats}, nulls={nulls}" if nulls else f"{line}: {stats}"
+
+
+def _top_groups(df: pd.DataFrame, top_k: int) -> str:
+    """Rank the groups of the first label column by the first numeric column."""
+    labels = [c for c in df.columns if df[c].dtype == object]
+    numbers = [
+        c
+        for c in df.columns
+        if pd.api.types.is_numeric_dtype(df[c])
+        and not pd.api.types.is_bool_dtype(df[c])
+    ]
+    if not labels or not numbers or top_k <= 0:
+        return ""
+
+    label, number = labels[0], numbers[0]
+    totals = df.groupby(label, dropna=False)[number].sum()
+    if len(totals) <= 1:
+        return ""
+
+    top = totals.nlargest(top_k)
+    lines = [f"- {_truncate(key)}: {_format(value)}" for key, value in top.items()]
+    header = f"Top {len(top)} of {len(totals)} {label} by total {number}:"
+    return header + "\n" + "\n".join(lines)
+
+
+def _fit_lines(lines: List[str], budget: int, more: str) -> List[str]:
+    """Keep as many lines as fit the budget, noting how many were dropped."""
+    counts = [count_tokens(line) for line in lines]
+    if sum(counts) <= budget:
+        return lines
+
+    kept, used = [], count_tokens(more.format(len(lines)))
+    for line, tokens in zip(lines, counts):
+        used += tokens
+        if used > budget:
+            break
+
+        kept.append(line)
+
+    return kept + [more.format(len(lines) - len(kept))] if kept else []
+
+
+def _fit_table(df: pd.DataFrame, budget: int, title: str) -> str:
+    """Render the most leading rows of a frame as markdown that fit the budget."""
+    rows = len(df)
+    frame = df.map(_truncate) if rows else df
+    while rows:
+        table = (
+            title.format(rows)
+            + "\n"
+            + frame.head(rows).to_markdown(index=False, floatfmt=".2f")
+        )
+        if count_tokens(table) <= budget:
+            return table
+
+        rows //= 2
+
+    return ""
+
+
+def _truncate(value):
+    """Shorten long text values for display."""
+    if isinstance(value, str) and len(value) > MAX_CELL_CHARS:
+        return value[: MAX_CELL_CHARS - 3] + "..."
+
+    return value
+
+
+def _format(value) -> str:
+    """Format a number with two decimals unless it is integral."""
+    if isinstance(value, (float, np.floating)) and not float(value).is_integer():
+        return f"{value:.2f}"
+
+    if isinstance(value, (float, np.floating)) and np.isfinite(value):
+        return str(int(value))
+
+    return str(value)
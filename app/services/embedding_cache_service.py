@@ -0,0 +1,66 @@
+import threading
+from collections import OrderedDict
+from typing import Callable, List, Sequence
+from app.config import settings
+
+
+class EmbeddingCache:
+    """
+    Question embeddings keyed by the exact question text.
+
+    Answering a question embeds it for the answer cache and for each of the
+    three training data lookups; with this cache the embedding model runs
+    once per distinct question. Entries are evicted least recently used
+    first.
+    """
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def get(
+        self, text: str, embed: Callable[[List[str]], Sequence[Sequence[float]]]
+    ) -> Sequence[float]:
+        """Return the embedding of text, computing it with embed on a miss."""
+        with self.lock:
+            if text in self.entries:
+                self.entries.move_to_end(text)
+                self.hits += 1
+                return self.entries[text]
+
+            self.misses += 1
+
+        embedding = embed([text])[0]
+        if self.max_entries <= 0:
+            return embedding
+
+        with self.lock:
+            self.entries[text] = embedding
+            self.entries.move_to_end(text)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+        return embedding
+
+    def stats(self) -> dict:
+        """Return size and hit/miss counters."""
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self.entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+            }
+
+
+embedding_cache = EmbeddingCache(max_entries=settings.embedding_cache_size)
+
+
+def get_embedding_cache() -> EmbeddingCache:
+    """Get question embedding cache instance."""
+    return embedding_cache
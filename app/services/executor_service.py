@@ -0,0 +1,101 @@
+import asyncio
+import contextvars
+import functools
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from app.config import settings
+
+
+class BoundedExecutor:
+    """
+    Thread pool dedicated to one kind of blocking work.
+
+    Routes await run() instead of calling blocking code on the event loop, so
+    a saturated pool only delays requests of its own kind. Queue depth and
+    in-flight counts are tracked for the stats endpoint.
+    """
+
+    def __init__(self, name: str, max_workers: int):
+        self.name = name
+        self.max_workers = max_workers
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix=f"{name}-worker"
+        )
+        self.queued = 0
+        self.running = 0
+        self.completed = 0
+        self.failed = 0
+        self.lock = threading.Lock()
+
+    async def run(self, fn, *args, **kwargs):
+        """Run fn(*args, **kwargs) on the pool and await its result."""
+        with self.lock:
+            self.queued += 1
+
+        loop = asyncio.get_running_loop()
+        call = functools.partial(self._call, fn, *args, **kwargs)
+        # Run in the caller's context so work is timed against its trace.
+        context = contextvars.copy_context()
+        return await loop.run_in_executor(self.executor, context.run, call)
+
+    def submit(self, fn, *args, **kwargs) -> Future:
+        """Start fn(*args, **kwargs) on the pool from a worker thread."""
+        with self.lock:
+            self.queued += 1
+
+        call = functools.partial(self._call, fn, *args, **kwargs)
+        context = contextvars.copy_context()
+        return self.executor.submit(context.run, call)
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> dict:
+        """Return concurrency limit, queue depth and completion counters."""
+        with self.lock:
+            return {
+                "max_workers": self.max_workers,
+                "queued": self.queued,
+                "running": self.running,
+                "completed": self.completed,
+                "failed": self.failed,
+            }
+
+    def _call(self, fn, *args, **kwargs):
+        with self.lock:
+            self.queued -= 1
+            self.running += 1
+
+        try:
+            return fn(*args, **kwargs)
+        except Exception:
+            with self.lock:
+                self.failed += 1
+            raise
+        finally:
+            with self.lock:
+                self.running -= 1
+                self.completed += 1
+
+
+executors = {
+    "llm": BoundedExecutor("llm", settings.llm_workers),
+    "sql": BoundedExecutor("sql", settings.sql_workers),
+    "render": BoundedExecutor("render", settings.render_workers),
+    "training": BoundedExecutor("training", settings.training_workers),
+    "retrieval": BoundedExecutor("retrieval", settings.retrieval_workers),
+}
+
+
+def get_executor(name: str) -> BoundedExecutor:
+    """
+    Get the executor for a kind of work: llm, sql, render, training or
+    retrieval.
+    """
+    return executors[name]
+
+
+def shutdown_executors():
+    """Stop accepting work on every executor."""
+    for executor in executors.values():
+        executor.shutdown()
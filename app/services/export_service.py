@@ -0,0 +1,182 @@
+import zlib
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from typing import Iterable, Iterator, List, Optional, Union
+
+
+class ChunkSink:
+    """Write-only file object that hands written bytes back in chunks."""
+
+    def __init__(self):
+        self.chunks = []
+        self.closed = False
+
+    def write(self, data) -> int:
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+def frame_chunks(df: pd.DataFrame, rows: int) -> Iterator[pd.DataFrame]:
+    """Split a frame into row slices without copying it."""
+    for start in range(0, len(df), rows):
+        yield df.iloc[start : start + rows]
+
+
+def table_chunks(table: pa.Table, rows: int) -> Iterator[pa.Table]:
+    """Split a table into row slices without copying it."""
+    for start in range(0, table.num_rows, rows):
+        yield table.slice(start, rows)
+
+
+def table_frames(table: pa.Table, rows: int) -> Iterator[pd.DataFrame]:
+    """Materialize a table written from a frame one row slice at a time."""
+    for chunk in table_chunks(table, rows):
+        yield chunk.to_pandas(split_blocks=True)
+
+
+def drop_index(table: pa.Table) -> pa.Table:
+    """Drop the index columns and pandas metadata of a table written from a frame."""
+    metadata = table.schema.pandas_metadata or {}
+    index = [
+        name for name in metadata.get("index_columns", []) if isinstance(name, str)
+    ]
+    return table.drop_columns(index).replace_schema_metadata(None)
+
+
+def cursor_chunks(
+    columns: List[str], batches: Iterable[list]
+) -> Iterator[pd.DataFrame]:
+    """Turn cursor row batches into frames indexed like a single result frame."""
+    start = 0
+    for rows in batches:
+        chunk = pd.DataFrame.from_records(rows, columns=columns)
+        chunk.index = pd.RangeIndex(start, start + len(chunk))
+        start += len(chunk)
+        yield chunk
+
+
+def result_schema(columns: List[str], batches: Iterable[list]) -> pa.Schema:
+    """
+    Type the columns of a query result from every value in it. A SQLite
+    column can hold values of any type, so it is typed int64 only if all its
+    values are integers, float64 if they are all numbers, binary if they are
+    all blobs, and string otherwise, including when it holds only nulls.
+    """
+    kinds = [set() for _ in columns]
+    for rows in batches:
+        for kind, values in zip(kinds, zip(*rows)):
+            kind.update(map(type, values))
+
+    return pa.schema(
+        [pa.field(name, _arrow_type(kind)) for name, kind in zip(columns, kinds)]
+    )
+
+
+def cursor_tables(schema: pa.Schema, batches: Iterable[list]) -> Iterator[pa.Table]:
+    """
+    Turn cursor row batches into Arrow tables of a schema from result_schema.
+    Values in string columns that are not strings are written as text.
+    """
+    for rows in batches:
+        arrays = []
+        for field, values in zip(schema, zip(*rows)):
+            if pa.types.is_string(field.type):
+                values = [
+                    value if value is None or isinstance(value, str) else str(value)
+                    for value in values
+                ]
+            arrays.append(pa.array(values, type=field.type))
+
+        yield pa.Table.from_arrays(arrays, schema=schema)
+
+
+def csv_chunks(chunks: Iterable[pd.DataFrame]) -> Iterator[bytes]:
+    """Encode frames as one CSV document, writing the header once."""
+    header = True
+    for chunk in chunks:
+        yield chunk.to_csv(header=header).encode("utf-8")
+        header = False
+
+
+def gzip_chunks(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    """Gzip-compress a byte stream incrementally."""
+    compressor = zlib.compressobj(wbits=31)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+
+    yield compressor.flush()
+
+
+def arrow_chunks(
+    chunks: Iterable[Union[pd.DataFrame, pa.Table]],
+    format: str = "arrow",
+    schema: Optional[pa.Schema] = None,
+) -> Iterator[bytes]:
+    """
+    Encode frames or tables as an Arrow IPC stream or a Parquet file with one
+    row group per chunk. Without an explicit schema it is taken from the first
+    chunk, with all-null columns typed as strings.
+    """
+    sink = ChunkSink()
+    writer = None
+
+    for chunk in chunks:
+        if isinstance(chunk, pd.DataFrame):
+            if schema is None:
+                schema = _schema(chunk)
+            chunk = pa.Table.from_pandas(chunk, schema=schema, preserve_index=False)
+
+        if writer is None:
+            schema = schema or chunk.schema
+            writer = _writer(sink, schema, format)
+
+        writer.write_table(chunk)
+        yield sink.drain()
+
+    if writer is None:
+        writer = _writer(sink, schema or pa.schema([]), format)
+
+    writer.close()
+    yield sink.drain()
+
+
+def _schema(df: pd.DataFrame) -> pa.Schema:
+    schema = pa.Schema.from_pandas(df, preserve_index=False)
+    for i, field in enumerate(schema):
+        if pa.types.is_null(field.type):
+            schema = schema.set(i, field.with_type(pa.string()))
+
+    return schema.remove_metadata()
+
+
+def _arrow_type(kinds: set) -> pa.DataType:
+    kinds = kinds - {type(None)}
+    if kinds and kinds <= {int}:
+        return pa.int64()
+    if kinds and kinds <= {int, float}:
+        return pa.float64()
+    if kinds == {bytes}:
+        return pa.binary()
+
+    return pa.string()
+
+
+def _writer(sink: ChunkSink, schema: pa.Schema, format: str):
+    if format == "parquet":
+        return pq.ParquetWriter(sink, schema)
+
+    return pa.ipc.new_stream(sink, schema)
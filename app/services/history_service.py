@@ -0,0 +1,140 @@
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+from app.config import settings
+
+
+class QuestionHistory:
+    """
+    Asked questions in a SQLite database, newest first.
+
+    Rows are keyed by an autoincrementing sequence number that doubles as the
+    pagination cursor, so reading a page costs an index range scan of that
+    page. Questions and SQL are indexed with FTS5 for search; on SQLite builds
+    without FTS5, search falls back to a LIKE scan.
+    """
+
+    def __init__(self, path: str = "history.sqlite"):
+        self.path = path
+        self.local = threading.local()
+
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS history (
+                    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                    id TEXT NOT NULL UNIQUE,
+                    question TEXT NOT NULL,
+                    sql TEXT,
+                    created_at REAL NOT NULL
+                );
+                """)
+            self.fts = self._create_fts(conn)
+
+    def record(self, id: str, question: str, sql: Optional[str] = None):
+        """Add a question, or set the SQL of one already recorded."""
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO history (id, question, sql, created_at) "
+                "VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (id) DO UPDATE SET sql = excluded.sql",
+                (id, question, sql, time.time()),
+            )
+
+    def page(
+        self,
+        cursor: Optional[int] = None,
+        limit: int = 50,
+        search: Optional[str] = None,
+    ) -> Tuple[List[Dict], Optional[int]]:
+        """
+        Return up to limit questions older than cursor, newest first, and the
+        cursor of the next page, or None when there are no more.
+        """
+        conditions, params = [], []
+        source = "history h"
+        search = (search or "").strip()
+
+        if cursor is not None:
+            conditions.append("h.seq < ?")
+            params.append(cursor)
+
+        if search and self.fts:
+            source = "history_fts f JOIN history h ON h.seq = f.rowid"
+            conditions.append("history_fts MATCH ?")
+            params.append(self._match(search))
+        elif search:
+            conditions.append("(h.question LIKE ? OR h.sql LIKE ?)")
+            params += [f"%{search}%"] * 2
+
+        where = " AND ".join(conditions) or "1"
+
+        rows = (
+            self._connect()
+            .execute(
+                f"SELECT h.seq, h.id, h.question, h.sql, h.created_at "
+                f"FROM {source} WHERE {where} ORDER BY h.seq DESC LIMIT ?",
+                params + [limit + 1],
+            )
+            .fetchall()
+        )
+
+        items = [
+            {"id": id, "question": question, "sql": sql, "created_at": created_at}
+            for _, id, question, sql, created_at in rows[:limit]
+        ]
+        next_cursor = rows[limit - 1][0] if len(rows) > limit else None
+        return items, next_cursor
+
+    def _create_fts(self, conn: sqlite3.Connection) -> bool:
+        """Create the FTS5 index and its sync triggers if SQLite supports it."""
+        try:
+            conn.executescript("""
+                CREATE VIRTUAL TABLE IF NOT EXISTS history_fts USING fts5 (
+                    question, sql, content='history', content_rowid='seq'
+                );
+                CREATE TRIGGER IF NOT EXISTS history_ai AFTER INSERT ON history
+                BEGIN
+                    INSERT INTO history_fts (rowid, question, sql)
+                    VALUES (new.seq, new.question, new.sql);
+                END;
+                CREATE TRIGGER IF NOT EXISTS history_au AFTER UPDATE ON history
+                BEGIN
+                    INSERT INTO history_fts (history_fts, rowid, question, sql)
+                    VALUES ('delete', old.seq, old.question, old.sql);
+                    INSERT INTO history_fts (rowid, question, sql)
+                    VALUES (new.seq, new.question, new.sql);
+                END;
+                CREATE TRIGGER IF NOT EXISTS history_ad AFTER DELETE ON history
+                BEGIN
+                    INSERT INTO history_fts (history_fts, rowid, question, sql)
+                    VALUES ('delete', old.seq, old.question, old.sql);
+                END;
+                """)
+            return True
+        except sqlite3.OperationalError:
+            return False
+
+    @staticmethod
+    def _match(search: str) -> str:
+        """Turn free text into an FTS5 query matching every word as a prefix."""
+        terms = search.split()
+        return " ".join('"%s"*' % term.replace('"', '""') for term in terms)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self.local.conn = conn
+
+        return conn
+
+
+history = QuestionHistory(path=settings.history_path)
+
+
+def get_history() -> QuestionHistory:
+    """Get question history instance."""
+    return history
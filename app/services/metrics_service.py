@@ -0,0 +1,162 @@
+import contextvars
+import logging
+import os
+import time
+import uuid
+from contextlib import contextmanager
+from typing import List, Optional, Tuple
+from prometheus_client import (
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    multiprocess,
+)
+
+logger = logging.getLogger(__name__)
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+
+STAGE_SECONDS = Histogram(
+    "vanna_stage_duration_seconds",
+    "Time spent in each stage of answering a question",
+    ["stage"],
+    buckets=BUCKETS,
+)
+REQUEST_SECONDS = Histogram(
+    "vanna_request_duration_seconds",
+    "HTTP request latency by route and status",
+    ["route", "status"],
+    buckets=BUCKETS,
+)
+REQUESTS_IN_FLIGHT = Gauge(
+    "vanna_requests_in_flight",
+    "HTTP requests currently being served",
+    multiprocess_mode="livesum",
+)
+FIRST_TOKEN_SECONDS = Histogram(
+    "vanna_llm_first_token_seconds",
+    "Time from sending a streamed prompt to its first generated token",
+    buckets=BUCKETS,
+)
+PROMPT_TOKENS = Histogram(
+    "vanna_sql_prompt_tokens",
+    "Approximate tokens in SQL prompts and each part of their context",
+    ["part"],
+    buckets=(100, 250, 500, 750, 1000, 1500, 2000, 3000, 4000, 6000, 8000),
+)
+LLM_TOKENS = Counter("vanna_llm_tokens_total", "Tokens processed by the LLM", ["kind"])
+
+
+class Trace:
+    """Stage timings of one request, reported with its trace id."""
+
+    def __init__(self, id: str):
+        self.id = id
+        self.stages: List[Tuple[str, float]] = []
+
+
+current_trace: contextvars.ContextVar[Optional[Trace]] = contextvars.ContextVar(
+    "current_trace", default=None
+)
+
+
+@contextmanager
+def timed(stage: str):
+    """Observe the duration of a stage and add it to the current trace."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        STAGE_SECONDS.labels(stage).observe(elapsed)
+
+        trace = current_trace.get()
+        if trace is not None:
+            trace.stages.append((stage, elapsed))
+
+
+def record_tokens(prompt: Optional[int], completion: Optional[int]):
+    """Count the prompt and completion tokens of one LLM call."""
+    if prompt:
+        LLM_TOKENS.labels("prompt").inc(prompt)
+    if completion:
+        LLM_TOKENS.labels("completion").inc(completion)
+
+
+def metrics_registry() -> CollectorRegistry:
+    """
+    Return the registry to scrape. With several workers run.py sets
+    PROMETHEUS_MULTIPROC_DIR, and a scrape adds up the metrics of them all.
+    """
+    if "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+        return REGISTRY
+
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+
+def shutdown_metrics():
+    """Drop this worker's live gauges from the multiprocess metrics."""
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        multiprocess.mark_process_dead(os.getpid())
+
+
+class TraceMiddleware:
+    """
+    ASGI middleware that gives every HTTP request a trace id.
+
+    The id is taken from an incoming X-Trace-Id header or generated, and is
+    returned in the X-Trace-Id response header. Request latency is observed
+    per route and status, and requests slower than slow_seconds are logged
+    with the stages they spent their time in.
+    """
+
+    def __init__(self, app, slow_seconds: float = 10.0):
+        self.app = app
+        self.slow_seconds = slow_seconds
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        headers = dict(scope["headers"])
+        trace = Trace(headers.get(b"x-trace-id", b"").decode() or uuid.uuid4().hex)
+        token = current_trace.set(trace)
+        status = 500
+        started = time.perf_counter()
+
+        async def send_with_trace(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message["headers"] = [
+                    *message.get("headers", []),
+                    (b"x-trace-id", trace.id.encode()),
+                ]
+            await send(message)
+
+        REQUESTS_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_with_trace)
+        finally:
+            REQUESTS_IN_FLIGHT.dec()
+            elapsed = time.perf_counter() - started
+            route = getattr(scope.get("route"), "path", "unmatched")
+            REQUEST_SECONDS.labels(route, str(status)).observe(elapsed)
+
+            if elapsed >= self.slow_seconds:
+                stages = ", ".join(f"{name}={s:.3f}s" for name, s in trace.stages)
+                logger.warning(
+                    "Slow request %s %s took %.3fs trace=%s status=%s stages: %s",
+                    scope["method"],
+                    scope["path"],
+                    elapsed,
+                    trace.id,
+                    status,
+                    stages or "none",
+                )
+
+            current_trace.reset(token)
@@ -0,0 +1,117 @@
+import re
+import threading
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+from collections import OrderedDict
+from typing import Optional, Tuple
+from app.config import settings
+from app.services.result_cache_service import SQL_TOKENS, normalize_sql
+
+NUMBER = re.compile(r"(?<![\w.])\d+(?:\.\d+)?(?![\w.])")
+
+
+def sql_template(sql: str) -> str:
+    """Reduce SQL to its shape by replacing string and number literals with ?."""
+    parts = []
+    for part in SQL_TOKENS.split(normalize_sql(sql)):
+        if part.startswith("'"):
+            parts.append("?")
+        elif part.startswith('"'):
+            parts.append(part)
+        else:
+            parts.append(NUMBER.sub("?", part.lower()))
+
+    return "".join(parts)
+
+
+def frame_schema(df: pd.DataFrame) -> Tuple:
+    """Return the column names and dtypes of a frame."""
+    return tuple((str(column), str(dtype)) for column, dtype in df.dtypes.items())
+
+
+def try_plotly_code(code: str, df: pd.DataFrame) -> Optional[go.Figure]:
+    """
+    Execute Plotly code against a frame and return the figure it builds, or
+    None if it raises or builds no figure. Unlike vanna.get_plotly_figure this
+    never substitutes a default chart, so it can tell whether the code works.
+    """
+    namespace = {"df": df.copy(deep=False), "pd": pd, "px": px, "go": go}
+    try:
+        exec(code, namespace)
+    except Exception:
+        return None
+
+    fig = namespace.get("fig")
+    return fig if isinstance(fig, go.Figure) else None
+
+
+class PlotlyCodeCache:
+    """
+    Generated Plotly code keyed by SQL template and result schema.
+
+    The same report asked for a different month or limit yields the same SQL
+    template and columns, so the chart code generated for one can be reused
+    for the other. Callers validate a hit by executing it against the new
+    frame and discard it when it fails.
+    """
+
+    def __init__(self, max_entries: int = 512):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.invalid = 0
+        self.lock = threading.Lock()
+
+    def get(self, sql: str, df: pd.DataFrame) -> Optional[str]:
+        """Return cached code for a query shape and schema, or None."""
+        key = (sql_template(sql), frame_schema(df))
+        with self.lock:
+            if key not in self.entries:
+                self.misses += 1
+                return None
+
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return self.entries[key]
+
+    def put(self, sql: str, df: pd.DataFrame, code: str):
+        """Store code that produced a figure for this query shape and schema."""
+        if self.max_entries <= 0:
+            return
+
+        key = (sql_template(sql), frame_schema(df))
+        with self.lock:
+            self.entries[key] = code
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def discard(self, sql: str, df: pd.DataFrame):
+        """Drop cached code that failed against a new frame."""
+        key = (sql_template(sql), frame_schema(df))
+        with self.lock:
+            if self.entries.pop(key, None) is not None:
+                self.invalid += 1
+
+    def stats(self) -> dict:
+        """Return size and hit/miss/invalidation counters."""
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self.entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalid": self.invalid,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+            }
+
+
+plotly_cache = PlotlyCodeCache(max_entries=settings.plotly_cache_size)
+
+
+def get_plotly_cache() -> PlotlyCodeCache:
+    """Get Plotly code cache instance."""
+    return plotly_cache
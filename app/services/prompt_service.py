@@ -0,0 +1,206 @@
+import logging
+import re
+import threading
+from typing import Dict, List, Optional, Tuple
+from app.services.database_service import get_pool
+from app.services.digest_service import TOKEN, count_tokens
+from app.services.metrics_service import PROMPT_TOKENS
+
+logger = logging.getLogger(__name__)
+
+TABLES_SQL = (
+    "SELECT name FROM sqlite_master WHERE type IN ('table', 'view') "
+    "AND name NOT LIKE 'sqlite_%' ORDER BY name"
+)
+CREATE = re.compile(
+    r"CREATE\s+(?:TEMP\w*\s+)?(?:TABLE|VIEW)\s+(?:IF\s+NOT\s+EXISTS\s+)?"
+    r"[\"'`\[]?(\w+)",
+    re.IGNORECASE,
+)
+# count_tokens undercounts real tokenizers, so only this share of the budget
+# is packed.
+BUDGET_SHARE = 0.8
+
+
+def describe_table(conn, name: str) -> Dict:
+    """
+    Summarize one table as a one-line schema, e.g.
+    customer(msisdn TEXT PK, name TEXT, region_id INTEGER -> region.id),
+    with its column names and the tables its foreign keys reference.
+    """
+    quoted = '"%s"' % name.replace('"', '""')
+    columns = conn.execute(f"PRAGMA table_info({quoted})").fetchall()
+    keys = conn.execute(f"PRAGMA foreign_key_list({quoted})").fetchall()
+    references = {key[3]: f"{key[2]}.{key[4] or 'rowid'}" for key in keys}
+
+    parts = []
+    for _, column, type, _, _, pk in columns:
+        part = f"{column} {type}".strip()
+        if pk:
+            part += " PK"
+        if column in references:
+            part += f" -> {references[column]}"
+        parts.append(part)
+
+    return {
+        "line": f"{name}({', '.join(parts)})",
+        "columns": {column.lower() for _, column, *_ in columns},
+        "references": sorted({key[2] for key in keys}),
+    }
+
+
+class SchemaContext:
+    """
+    Compact one-line descriptions of every table, built from sqlite_master.
+
+    The lines are computed once and rebuilt when the schema watcher sees the
+    schema change, so assembling a prompt never touches the database.
+    """
+
+    def __init__(self):
+        self.tables: Optional[Dict[str, Dict]] = None
+        self.lock = threading.Lock()
+
+    def refresh(self) -> Dict[str, Dict]:
+        """Rebuild the table summaries from the database."""
+        with get_pool().connection() as conn:
+            names = [name for name, in conn.execute(TABLES_SQL).fetchall()]
+            tables = {name: describe_table(conn, name) for name in names}
+
+        with self.lock:
+            self.tables = tables
+        return tables
+
+    def get(self) -> Dict[str, Dict]:
+        """Return the table summaries, building them on first use."""
+        with self.lock:
+            tables = self.tables
+        return tables if tables is not None else self.refresh()
+
+
+def rank_tables(
+    question: str, ddl_list: List[str], tables: Dict[str, Dict]
+) -> Tuple[List[str], List[str]]:
+    """
+    Split tables into those relevant to a question and the rest. Relevant
+    tables are, in order: those whose DDL was retrieved, in retrieval order,
+    then those named in the question or with columns it mentions, then the
+    tables these reference by foreign key.
+    """
+    words = {word.lower() for word in TOKEN.findall(question)}
+    words |= {word[:-1] for word in words if word.endswith("s")}
+
+    scores = dict.fromkeys(tables, 0)
+    for rank, name in enumerate(_created(ddl_list)):
+        if name in scores:
+            scores[name] = max(scores[name], 1000 - rank)
+
+    for name, table in tables.items():
+        if name.lower() in words:
+            scores[name] += 10
+        scores[name] += len(words & table["columns"])
+
+    ranked = sorted((n for n in tables if scores[n] > 0), key=lambda n: -scores[n])
+    referenced = [
+        reference
+        for name in ranked
+        for reference in tables[name]["references"]
+        if reference in tables
+    ]
+    relevant = list(dict.fromkeys(ranked + referenced))
+    return relevant, [name for name in sorted(tables) if name not in relevant]
+
+
+def pack_context(
+    question: str,
+    question_sql_list: List[Dict],
+    ddl_list: List[str],
+    doc_list: List[str],
+    tables: Dict[str, Dict],
+    token_budget: int = 1200,
+    pinned_docs: Optional[List[str]] = None,
+) -> Tuple[List[Dict], List[str], List[str]]:
+    """
+    Fit the context of a SQL prompt into BUDGET_SHARE of a token budget.
+    Relevant tables go in first as compact schema lines. Pinned documentation,
+    such as the results of an intermediate query, comes next and is cut short
+    rather than skipped when it does not fit. Then follow retrieved DDL that
+    does not describe a table in the database, example question/SQL pairs and
+    documentation in retrieval order, and the remaining tables while budget
+    is left. Items that do not fit are skipped. Returns the examples, the
+    schema as a single DDL entry and the documentation, ready for vanna's
+    get_sql_prompt.
+    """
+    budget = int(token_budget * BUDGET_SHARE)
+
+    def fits(text: str) -> bool:
+        nonlocal budget
+        tokens = count_tokens(text)
+        if tokens > budget:
+            return False
+        budget -= tokens
+        return True
+
+    relevant, rest = rank_tables(question, ddl_list, tables)
+    other_ddl = [
+        ddl for ddl, name in zip(ddl_list, _created(ddl_list)) if name not in tables
+    ]
+
+    schema = [tables[name]["line"] for name in relevant if fits(tables[name]["line"])]
+    pinned = [_truncate(doc, budget) for doc in pinned_docs or []]
+    pinned = [doc for doc in pinned if doc and fits(doc)]
+    schema += [ddl for ddl in other_ddl if fits(ddl)]
+    examples = [
+        example
+        for example in question_sql_list
+        if example
+        and "question" in example
+        and "sql" in example
+        and fits(f"{example['question']}\n{example['sql']}")
+    ]
+    docs = pinned + [doc for doc in doc_list if fits(doc)]
+    schema += [tables[name]["line"] for name in rest if fits(tables[name]["line"])]
+
+    return examples, ["\n".join(schema)] if schema else [], docs
+
+
+def log_prompt(prompt: List[Dict], schema: List[str], examples, docs):
+    """Log and observe the token size of a SQL prompt and its parts."""
+    sizes = {
+        "schema": sum(count_tokens(ddl) for ddl in schema),
+        "examples": sum(count_tokens(f"{e['question']}\n{e['sql']}") for e in examples),
+        "documentation": sum(count_tokens(doc) for doc in docs),
+        "total": sum(count_tokens(message["content"]) for message in prompt),
+    }
+    for part, tokens in sizes.items():
+        PROMPT_TOKENS.labels(part).observe(tokens)
+
+    logger.info(
+        "SQL prompt: %(total)d tokens (schema %(schema)d, examples %(examples)d, "
+        "documentation %(documentation)d)",
+        sizes,
+    )
+
+
+def _truncate(text: str, tokens: int) -> str:
+    """Cut text after its first tokens tokens, as counted by count_tokens."""
+    matches = TOKEN.finditer(text)
+    for index, match in enumerate(matches):
+        if index == tokens:
+            return text[: match.start()].rstrip()
+
+    return text if tokens > 0 else ""
+
+
+def _created(ddl_list: List[str]) -> List[Optional[str]]:
+    """Return the table or view each DDL statement creates, or None."""
+    matches = [CREATE.search(ddl) for ddl in ddl_list]
+    return [match.group(1) if match else None for match in matches]
+
+
+schema_context = SchemaContext()
+
+
+def get_schema_context() -> SchemaContext:
+    """Get compact schema instance."""
+    return schema_context
@@ -0,0 +1,150 @@
+import pandas as pd
+from typing import Callable, List, Optional, Tuple
+from starlette.concurrency import run_in_threadpool
+from app.services.vanna_service import vanna
+from app.services.answer_cache_service import get_answer_cache, normalize_question
+from app.services.result_cache_service import get_result_cache, normalize_sql
+from app.services.executor_service import get_executor
+from app.services.singleflight_service import get_flight
+from app.services.chart_service import render_chart
+from app.services.plotly_cache_service import get_plotly_cache, try_plotly_code
+from app.services.digest_service import build_digest
+from app.services.metrics_service import timed
+from app.config import settings
+
+
+async def answer_question(
+    question: str, on_token: Optional[Callable[[str], None]] = None
+) -> str:
+    """
+    Generate SQL for a question, sharing the call with identical questions.
+    When the LLM is asked, on_token is called from its worker thread with each
+    piece of the response as it is generated; answers from the answer cache
+    or from an identical question already in flight arrive whole.
+    """
+    flight = get_flight("generate_sql")
+    return await flight.do(
+        normalize_question(question), _generate_sql, question, on_token
+    )
+
+
+async def run_query(sql: str) -> pd.DataFrame:
+    """Run SQL through the result cache, sharing the call with identical SQL."""
+    result_cache = get_result_cache()
+    sql_executor = get_executor("sql")
+    flight = get_flight("run_sql")
+
+    return await flight.do(
+        normalize_sql(sql), sql_executor.run, result_cache.run, sql, vanna.run_sql
+    )
+
+
+def describe_result(df: pd.DataFrame) -> Tuple[str, str, str]:
+    """Return the JSON head, markdown preview and digest sent for a result."""
+    with timed("serialize"):
+        df_json = df.head(10).to_json(orient="records")
+        df_markdown = df.head(settings.preview_rows).to_markdown(index=False)
+        digest = build_digest(df, settings.digest_token_budget, settings.digest_top_k)
+
+    return df_json, df_markdown, digest
+
+
+async def chart_result(
+    question: str, sql: str, df: pd.DataFrame, render: bool = True
+) -> Tuple[str, Optional[str]]:
+    """Return the figure JSON and, when rendered, the chart URL for a result."""
+    flight = get_flight("generate_plotly_figure")
+    key = (normalize_question(question), normalize_sql(sql), render)
+
+    return await flight.do(key, _generate_figure, question, sql, df, render)
+
+
+async def suggest_followups(question: str, sql: str, df: pd.DataFrame) -> List[str]:
+    """Generate follow-up questions for a result."""
+    llm = get_executor("llm")
+    flight = get_flight("generate_followup_questions")
+
+    return await flight.do(
+        (normalize_question(question), normalize_sql(sql)),
+        llm.run,
+        vanna.generate_followup_questions,
+        question=question,
+        sql=sql,
+        df=df,
+    )
+
+
+async def _generate_sql(question, on_token=None):
+    """Answer a question from the answer cache, falling back to the LLM."""
+    answer_cache = get_answer_cache()
+    llm = get_executor("llm")
+
+    version = await run_in_threadpool(answer_cache.training_version)
+    sql = await run_in_threadpool(answer_cache.lookup, question)
+    if sql is None:
+        sql = await llm.run(
+            vanna.generate_sql,
+            question=question,
+            allow_llm_to_see_data=True,
+            on_token=on_token,
+        )
+        if vanna.is_sql_valid(sql):
+            await run_in_threadpool(answer_cache.put, question, sql, version)
+
+    return sql
+
+
+async def _generate_figure(question, sql, df, render=True):
+    """
+    Build, and optionally render, a chart for a result. Plotly code cached for
+    the same query shape and schema is tried first; the LLM is only asked for
+    new code when there is none or it fails against this frame.
+    """
+    llm = get_executor("llm")
+    render_executor = get_executor("render")
+    plotly_cache = get_plotly_cache()
+
+    code = plotly_cache.get(sql, df)
+    if code is not None:
+        chart = await render_executor.run(_build_chart, code, df, render)
+        if chart is not None:
+            return chart
+
+        plotly_cache.discard(sql, df)
+
+    code = await llm.run(
+        vanna.generate_plotly_code,
+        question=question,
+        sql=sql,
+        df_metadata="Running df.dtypes gives:\n %s" % df.dtypes,
+    )
+
+    chart = await render_executor.run(_build_chart, code, df, render)
+    if chart is not None:
+        plotly_cache.put(sql, df, code)
+        return chart
+
+    return await render_executor.run(_build_chart, code, df, render, True)
+
+
+def _build_chart(code, df, render, fallback=False):
+    """
+    Execute Plotly code against a frame and render the figure if asked.
+    Returns None when the code fails, unless fallback is set, in which case
+    vanna's default chart for the frame is used instead.
+    """
+    with timed("plotly"):
+        fig = try_plotly_code(code, df)
+        if fig is None and fallback:
+            # The generated code may mutate df, which is the cached frame.
+            fig = vanna.get_plotly_figure(
+                plotly_code=code, df=df.copy(deep=False), dark_mode=False
+            )
+
+    if fig is None:
+        return None
+
+    if not render:
+        return fig.to_json(), None
+
+    return render_chart(fig)
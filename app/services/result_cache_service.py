@@ -0,0 +1,186 @@
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Callable, Optional, Tuple
+from cache import sizeof
+from app.config import settings
+
+SQL_TOKENS = re.compile(
+    r"""('(?:[^']|'')*'|"(?:[^"]|"")*"|--[^\n]*|/\*.*?\*/|\s+)""", re.DOTALL
+)
+# REPLACE is also a string function, so only REPLACE INTO counts as a write.
+WRITE_KEYWORDS = re.compile(
+    r"\b(insert|update|delete|replace\s+into|create|drop|alter|attach|detach|"
+    r"pragma|vacuum|reindex|analyze|begin|commit|rollback|savepoint)\b",
+    re.IGNORECASE,
+)
+
+
+def normalize_sql(sql: str) -> str:
+    """Strip comments, collapse whitespace and drop trailing semicolons."""
+    parts = []
+    for part in SQL_TOKENS.split(sql):
+        if part.startswith(("--", "/*")) or part.isspace():
+            if parts and parts[-1] != " ":
+                parts.append(" ")
+        elif part:
+            parts.append(part)
+
+    return "".join(parts).rstrip("; ")
+
+
+def is_read_only(sql: str) -> bool:
+    """Check that a normalized statement is a single SELECT or WITH query."""
+    code = SQL_TOKENS.sub(" ", sql)
+    if ";" in code:
+        return False
+
+    return bool(re.match(r"\s*(select|with)\b", code, re.IGNORECASE)) and not (
+        WRITE_KEYWORDS.search(code)
+    )
+
+
+def database_version(path: Optional[str]) -> Tuple:
+    """Fingerprint a SQLite database by the size and mtime of its files."""
+    version = []
+    for suffix in ("", "-wal"):
+        try:
+            stat = os.stat(f"{path}{suffix}")
+            version.append((stat.st_mtime_ns, stat.st_size))
+        except (OSError, TypeError):
+            version.append(None)
+
+    return tuple(version)
+
+
+class ResultCache:
+    """
+    Cache of query results keyed by normalized SQL.
+
+    Every entry belongs to the database version it was read from. Any write
+    to the database file or its WAL changes the version, and the whole cache
+    is dropped on the next lookup, so stale rows are never served. Only
+    read-only statements are cached. Entries are evicted least recently used
+    first once max_entries or max_bytes is exceeded.
+    """
+
+    def __init__(
+        self,
+        version: Callable[[], Tuple],
+        max_entries: int = 256,
+        max_bytes: int = 256 * 1024 * 1024,
+    ):
+        self.version = version
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.sizes = {}
+        self.current = None
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.lock = threading.Lock()
+
+    def get(self, sql: str):
+        """Return the cached result of a query, or None on a miss."""
+        key = normalize_sql(sql)
+        version = self.version()
+
+        with self.lock:
+            self._check_version(version)
+
+            if key not in self.entries:
+                self.misses += 1
+                return None
+
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return self.entries[key].copy(deep=False)
+
+    def run(self, sql: str, run_sql: Callable):
+        """Return the result of a query, executing it on a cache miss."""
+        df = self.get(sql)
+        if df is not None:
+            return df
+
+        version = self.version()
+        df = run_sql(sql)
+        self.put(sql, df, version)
+        return df
+
+    def put(self, sql: str, df, version: Tuple):
+        """Store a result read from the given database version."""
+        key = normalize_sql(sql)
+        if self.max_entries <= 0 or not is_read_only(key):
+            return
+
+        size = sizeof(df)
+        if size > self.max_bytes:
+            return
+
+        with self.lock:
+            self._check_version(self.version())
+            if version != self.current:
+                return
+
+            self.total_bytes += size - self.sizes.get(key, 0)
+            self.entries[key] = df
+            self.sizes[key] = size
+            self.entries.move_to_end(key)
+
+            while len(self.entries) > self.max_entries or (
+                self.total_bytes > self.max_bytes
+            ):
+                oldest, _ = self.entries.popitem(last=False)
+                self.total_bytes -= self.sizes.pop(oldest)
+                self.evictions += 1
+
+    def clear(self):
+        """Drop every cached result."""
+        with self.lock:
+            self.entries.clear()
+            self.sizes.clear()
+            self.total_bytes = 0
+
+    def stats(self) -> dict:
+        """Return size and hit/miss/eviction counters."""
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self.entries),
+                "bytes": self.total_bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+            }
+
+    def _check_version(self, version: Tuple):
+        if version == self.current:
+            return
+
+        if self.entries:
+            self.invalidations += 1
+
+        self.entries.clear()
+        self.sizes.clear()
+        self.total_bytes = 0
+        self.current = version
+
+
+result_cache = ResultCache(
+    version=lambda: database_version(settings.sqlite_path),
+    max_entries=settings.result_cache_size,
+    max_bytes=settings.result_cache_max_bytes,
+)
+
+
+def get_result_cache():
+    """Get result cache instance."""
+    return result_cache
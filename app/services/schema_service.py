@@ -0,0 +1,142 @@
+import asyncio
+import logging
+import threading
+from typing import Dict, Optional
+from vanna.utils import deterministic_uuid
+from app.config import settings
+from app.services.vanna_service import vanna
+from app.services.database_service import get_pool
+from app.services.executor_service import get_executor
+from app.services.answer_cache_service import get_answer_cache
+from app.services.training_service import add_batch
+from app.services.prompt_service import get_schema_context
+
+logger = logging.getLogger(__name__)
+
+SCHEMA_SQL = (
+    "SELECT name, sql FROM sqlite_master "
+    "WHERE sql IS NOT NULL AND name NOT LIKE 'sqlite_%' ORDER BY name"
+)
+# Chroma metadata marking the DDL entries added by sync_schema.
+SYNCED = {"source": "schema_sync"}
+
+
+def schema_version() -> int:
+    """Return SQLite's schema_version, which changes on every DDL statement."""
+    with get_pool().connection() as conn:
+        return conn.execute("PRAGMA schema_version").fetchone()[0]
+
+
+def schema_ddl() -> Dict[str, str]:
+    """Return the DDL of every schema object keyed by its vanna training id."""
+    with get_pool().connection() as conn:
+        rows = conn.execute(SCHEMA_SQL).fetchall()
+
+    return {deterministic_uuid(ddl) + "-ddl": ddl for _, ddl in rows}
+
+
+def sync_schema(prune_untagged: bool = False) -> dict:
+    """
+    Bring the DDL training data in line with the database schema. A DDL
+    entry's id is a hash of its text, so only objects whose DDL is new or
+    changed are embedded. Entries are stored with SYNCED metadata, and only
+    those that no longer match the schema are removed. Untagged entries that
+    match the schema, such as DDL trained before syncing existed, are adopted
+    by tagging them. Other untagged DDL is left alone unless prune_untagged
+    is set, for a one-time cleanup of stale DDL trained by hand.
+    """
+    version = schema_version()
+    current = schema_ddl()
+    stored = vanna.ddl_collection.get(include=["metadatas"])
+    untagged = [
+        id
+        for id, metadata in zip(stored["ids"], stored["metadatas"])
+        if not metadata or metadata.get("source") != SYNCED["source"]
+    ]
+    known = set(stored["ids"])
+    synced = known - set(untagged)
+
+    added = [ddl for id, ddl in current.items() if id not in known]
+    adopted = [id for id in untagged if id in current]
+    removed = [id for id in synced if id not in current]
+    if prune_untagged:
+        removed += [id for id in untagged if id not in current]
+
+    if added:
+        add_batch([{"ddl": ddl} for ddl in added], metadata=SYNCED)
+    if adopted:
+        vanna.ddl_collection.update(ids=adopted, metadatas=[SYNCED] * len(adopted))
+    if removed:
+        vanna.ddl_collection.delete(ids=removed)
+    if added or removed:
+        get_answer_cache().clear()
+
+    return {
+        "schema_version": version,
+        "added": len(added),
+        "adopted": len(adopted),
+        "removed": len(removed),
+        "unchanged": len(current) - len(added),
+    }
+
+
+class SchemaWatcher:
+    """
+    Re-sync DDL training data and the compact schema used in SQL prompts
+    whenever SQLite's schema version changes.
+
+    The version is polled every interval seconds; the first poll always
+    syncs, which is cheap when nothing changed since only hashes are compared.
+    """
+
+    def __init__(self, interval: int = 60):
+        self.interval = interval
+        self.version: Optional[int] = None
+        self.syncs = 0
+        self.last_sync: Optional[dict] = None
+        self.lock = threading.Lock()
+
+    def sync(self, prune_untagged: bool = False) -> dict:
+        """Sync the schema now and remember the version it was synced at."""
+        with self.lock:
+            result = sync_schema(prune_untagged)
+            get_schema_context().refresh()
+            self.version = result["schema_version"]
+            self.syncs += 1
+            self.last_sync = result
+
+        if result["added"] or result["adopted"] or result["removed"]:
+            logger.info("Schema synced: %s", result)
+
+        return result
+
+    async def run(self):
+        """Poll the schema version every interval seconds until cancelled."""
+        sql = get_executor("sql")
+        training = get_executor("training")
+
+        while self.interval > 0:
+            try:
+                if await sql.run(schema_version) != self.version:
+                    await training.run(self.sync)
+            except Exception:
+                logger.exception("Schema sync failed")
+
+            await asyncio.sleep(self.interval)
+
+    def stats(self) -> dict:
+        """Return the synced schema version and the last sync's changes."""
+        return {
+            "interval": self.interval,
+            "schema_version": self.version,
+            "syncs": self.syncs,
+            "last_sync": self.last_sync,
+        }
+
+
+watcher = SchemaWatcher(interval=settings.schema_sync_interval)
+
+
+def get_watcher() -> SchemaWatcher:
+    """Get schema watcher instance."""
+    return watcher
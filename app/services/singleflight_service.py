@@ -0,0 +1,64 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent identical calls into one computation.
+
+    The first caller for a key starts the coroutine. Callers arriving with the
+    same key while it is still running await the same result, or exception,
+    instead of starting their own. The shared work is shielded, so one
+    disconnected client does not cancel it for the others.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.inflight: Dict[Hashable, asyncio.Future] = {}
+        self.started = 0
+        self.coalesced = 0
+
+    async def do(
+        self, key: Hashable, fn: Callable[..., Awaitable[Any]], *args, **kwargs
+    ) -> Any:
+        """Await fn(*args, **kwargs), sharing the call with same-key callers."""
+        future = self.inflight.get(key)
+
+        if future is None:
+            future = asyncio.ensure_future(fn(*args, **kwargs))
+            self.inflight[key] = future
+            future.add_done_callback(lambda done: self._finish(key, done))
+            self.started += 1
+        else:
+            self.coalesced += 1
+
+        return await asyncio.shield(future)
+
+    def stats(self) -> dict:
+        """Return in-flight, started and coalesced call counts."""
+        return {
+            "inflight": len(self.inflight),
+            "started": self.started,
+            "coalesced": self.coalesced,
+        }
+
+    def _finish(self, key: Hashable, future: asyncio.Future):
+        if self.inflight.get(key) is future:
+            del self.inflight[key]
+
+        # Mark the exception as retrieved in case every waiter went away.
+        if not future.cancelled():
+            future.exception()
+
+
+flights = {
+    "generate_sql": SingleFlight("generate_sql"),
+    "run_sql": SingleFlight("run_sql"),
+    "generate_plotly_figure": SingleFlight("generate_plotly_figure"),
+    "generate_followup_questions": SingleFlight("generate_followup_questions"),
+}
+
+
+def get_flight(name: str) -> SingleFlight:
+    """Get the single-flight group for a stage."""
+    return flights[name]
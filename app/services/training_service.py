@@ -0,0 +1,147 @@
+import io
+import csv
+import json
+import pandas as pd
+from itertools import islice
+from typing import IO, Dict, Iterable, Iterator, List, Optional, Tuple
+from vanna.utils import deterministic_uuid
+from app.services.vanna_service import vanna
+
+KINDS = ("sql", "ddl", "documentation")
+
+
+def training_document(item: Dict) -> Optional[Tuple[str, str, str]]:
+    """
+    Turn one training item into (kind, id, document) exactly as vanna.train
+    would store it, so bulk loads and single trains share ids. Items are
+    question/sql pairs ("answer" is accepted for "sql", as in dataset.csv),
+    ddl or documentation. Returns None for items with none of those.
+    """
+    sql = item.get("sql") or item.get("answer")
+    if item.get("question") and sql:
+        document = json.dumps(
+            {"question": item["question"], "sql": sql}, ensure_ascii=False
+        )
+        return "sql", deterministic_uuid(document) + "-sql", document
+
+    if item.get("ddl"):
+        return "ddl", deterministic_uuid(item["ddl"]) + "-ddl", item["ddl"]
+
+    if item.get("documentation"):
+        document = item["documentation"]
+        return "documentation", deterministic_uuid(document) + "-doc", document
+
+    return None
+
+
+def read_items(file: IO[bytes], filename: str = "") -> Iterator[Dict]:
+    """
+    Stream training items from an uploaded CSV or JSONL file without loading
+    it whole. CSV files are read with their header row and a ; or , delimiter;
+    anything not named .csv is read as one JSON object per line.
+    """
+    text = io.TextIOWrapper(file, encoding="utf-8-sig", newline="")
+
+    if filename.lower().endswith(".csv"):
+        header = text.readline()
+        delimiter = ";" if header.count(";") > header.count(",") else ","
+        fields = next(csv.reader([header], delimiter=delimiter))
+        yield from csv.DictReader(text, fieldnames=fields, delimiter=delimiter)
+        return
+
+    for line in text:
+        if line.strip():
+            yield json.loads(line)
+
+
+def next_batch(items: Iterator[Dict], size: int) -> List[Dict]:
+    """Take up to size items from an iterator."""
+    return list(islice(items, size))
+
+
+def add_batch(items: Iterable[Dict], metadata: Optional[Dict] = None) -> Dict[str, int]:
+    """
+    Embed and insert a batch of training items with one embedding call and one
+    add per collection. Ids repeated within the batch are inserted once, and
+    every item is stored with the given Chroma metadata, if any. Returns how
+    many items of each kind were added and how many were skipped.
+    """
+    collections = _collections()
+    batches = {kind: {} for kind in KINDS}
+    counts = dict.fromkeys(KINDS + ("skipped",), 0)
+
+    for item in items:
+        document = training_document(item)
+        if document is None:
+            counts["skipped"] += 1
+            continue
+
+        kind, id, text = document
+        batches[kind][id] = text
+        counts[kind] += 1
+
+    for kind, documents in batches.items():
+        if not documents:
+            continue
+
+        texts = list(documents.values())
+        collections[kind].add(
+            ids=list(documents),
+            documents=texts,
+            embeddings=vanna.embedding_function(texts),
+            metadatas=[metadata] * len(texts) if metadata else None,
+        )
+
+    return counts
+
+
+def training_page(
+    kind: Optional[str] = None,
+    search: Optional[str] = None,
+    offset: int = 0,
+    limit: int = 25,
+) -> Tuple[pd.DataFrame, int]:
+    """
+    Return one page of training data and the total number of matching items.
+    Collections are paged in sql, ddl, documentation order, and only the
+    requested slice of documents is read from each. Totals come from the
+    collection count, or from matching ids alone when searching.
+    """
+    collections = _collections()
+    where = {"where_document": {"$contains": search}} if search else {}
+    rows, total = [], 0
+
+    for name in [kind] if kind else KINDS:
+        collection = collections[name]
+        if search:
+            count = len(collection.get(include=[], **where)["ids"])
+        else:
+            count = collection.count()
+
+        start = max(offset - total, 0)
+        wanted = min(limit - len(rows), count - start)
+        total += count
+        if wanted <= 0:
+            continue
+
+        page = collection.get(
+            offset=start, limit=wanted, include=["documents"], **where
+        )
+        for id, document in zip(page["ids"], page["documents"]):
+            question, content = None, document
+            if name == "sql":
+                pair = json.loads(document)
+                question, content = pair["question"], pair["sql"]
+            rows.append((id, question, content, name))
+
+    columns = ["id", "question", "content", "training_data_type"]
+    return pd.DataFrame(rows, columns=columns), total
+
+
+def _collections() -> Dict:
+    """Return vanna's Chroma collections by training data kind."""
+    return {
+        "sql": vanna.sql_collection,
+        "ddl": vanna.ddl_collection,
+        "documentation": vanna.documentation_collection,
+    }
@@ -1,7 +1,22 @@
 import os
+import json
+import time
+from typing import Optional, Tuple
 from app.config import settings
+from app.services.database_service import get_pool
+from app.services.executor_service import get_executor
+from app.services.embedding_cache_service import get_embedding_cache
+from app.services.metrics_service import FIRST_TOKEN_SECONDS, timed, record_tokens
+from app.services.prompt_service import get_schema_context, log_prompt, pack_context
 from vanna.ollama import Ollama
 from vanna.chromadb import ChromaDB_VectorStore
+from chromadb.utils.embedding_functions import OllamaEmbeddingFunction
+
+# Passed to on_token when the tokens streamed so far were an intermediate
+# query and the final answer follows. Pieces passed to on_token are never empty.
+RESET = ""
+# Rows of an intermediate query's result shown to the LLM.
+INTERMEDIATE_ROWS = 20
 
 
 class VannaService(ChromaDB_VectorStore, Ollama):
@@ -9,18 +24,210 @@ class VannaService(ChromaDB_VectorStore, Ollama):
         ChromaDB_VectorStore.__init__(self, config=config)
         Ollama.__init__(self, config=config)
 
+    def question_embedding(self, question: str):
+        """Embed a question, reusing the embedding of a question seen before."""
+        with timed("embedding"):
+            return get_embedding_cache().get(question, self.embedding_function)
+
+    def retrieve(self, question: str, **kwargs) -> Tuple[list, list, list]:
+        """
+        Return the similar question/SQL pairs, DDL and documentation for a
+        question. The question is embedded once and the three collections are
+        queried concurrently on the retrieval pool.
+        """
+        with timed("retrieval"):
+            self.question_embedding(question)
+            retrieval = get_executor("retrieval")
+            lookups = [
+                retrieval.submit(lookup, question, **kwargs)
+                for lookup in (
+                    self.get_similar_question_sql,
+                    self.get_related_ddl,
+                    self.get_related_documentation,
+                )
+            ]
+            return tuple(lookup.result() for lookup in lookups)
+
+    def get_similar_question_sql(self, question: str, **kwargs) -> list:
+        with timed("retrieval_sql"):
+            return self._query(self.sql_collection, question, self.n_results_sql)
+
+    def get_related_ddl(self, question: str, **kwargs) -> list:
+        with timed("retrieval_ddl"):
+            return self._query(self.ddl_collection, question, self.n_results_ddl)
+
+    def get_related_documentation(self, question: str, **kwargs) -> list:
+        with timed("retrieval_documentation"):
+            return self._query(
+                self.documentation_collection,
+                question,
+                self.n_results_documentation,
+            )
+
+    def get_sql_prompt(
+        self,
+        initial_prompt: str,
+        question: str,
+        question_sql_list: list,
+        ddl_list: list,
+        doc_list: list,
+        pinned_docs: Optional[list] = None,
+        **kwargs,
+    ):
+        """
+        Build vanna's SQL prompt from compact schema lines instead of whole
+        DDL, with the retrieved context that fits the prompt token budget.
+        pinned_docs are always included.
+        """
+        with timed("prompt"):
+            examples, schema, docs = pack_context(
+                question,
+                question_sql_list,
+                ddl_list,
+                doc_list,
+                get_schema_context().get(),
+                settings.sql_prompt_token_budget,
+                pinned_docs,
+            )
+            prompt = super().get_sql_prompt(
+                initial_prompt=initial_prompt,
+                question=question,
+                question_sql_list=examples,
+                ddl_list=schema,
+                doc_list=docs,
+                **kwargs,
+            )
+
+        log_prompt(prompt, schema, examples, docs)
+        return prompt
+
+    def generate_sql(self, question: str, allow_llm_to_see_data=False, **kwargs):
+        """
+        Generate SQL for a question as vanna does, with the training data
+        lookups done by retrieve() instead of one after another.
+        """
+        initial_prompt = self.config.get("initial_prompt") if self.config else None
+        question_sql_list, ddl_list, doc_list = self.retrieve(question, **kwargs)
+        prompt = self.get_sql_prompt(
+            initial_prompt=initial_prompt,
+            question=question,
+            question_sql_list=question_sql_list,
+            ddl_list=ddl_list,
+            doc_list=doc_list,
+            **kwargs,
+        )
+        self.log(title="SQL Prompt", message=prompt)
+        llm_response = self.submit_prompt(prompt, **kwargs)
+        self.log(title="LLM Response", message=llm_response)
+
+        if "intermediate_sql" not in llm_response:
+            return self.extract_sql(llm_response)
+
+        if not allow_llm_to_see_data:
+            return (
+                "The LLM is not allowed to see the data in your database. Your "
+                "question requires database introspection to generate the "
+                "necessary SQL. Please set allow_llm_to_see_data=True to enable "
+                "this."
+            )
+
+        intermediate_sql = self.extract_sql(llm_response)
+        on_token = kwargs.get("on_token")
+        try:
+            self.log(title="Running Intermediate SQL", message=intermediate_sql)
+            df = self.run_sql(intermediate_sql)
+            prompt = self.get_sql_prompt(
+                initial_prompt=initial_prompt,
+                question=question,
+                question_sql_list=question_sql_list,
+                ddl_list=ddl_list,
+                doc_list=doc_list,
+                pinned_docs=[
+                    "The following is a pandas DataFrame with the first "
+                    f"{INTERMEDIATE_ROWS} results of the intermediate SQL query "
+                    f"{intermediate_sql}: \n" + df.head(INTERMEDIATE_ROWS).to_markdown()
+                ],
+                **kwargs,
+            )
+            self.log(title="Final SQL Prompt", message=prompt)
+            if on_token is not None:
+                on_token(RESET)
+            llm_response = self.submit_prompt(prompt, **kwargs)
+            self.log(title="LLM Response", message=llm_response)
+        except Exception as e:
+            return f"Error running intermediate SQL: {e}"
+
+        return self.extract_sql(llm_response)
+
+    def submit_prompt(self, prompt, on_token=None, **kwargs) -> str:
+        """
+        Send a prompt to Ollama, recording its latency and token counts. With
+        on_token, the response is streamed and each piece is passed to it as
+        soon as Ollama generates it.
+        """
+        self.log(f"Prompt Content:\n{json.dumps(prompt, ensure_ascii=False)}")
+        started = time.perf_counter()
+        with timed("llm"):
+            response = self.ollama_client.chat(
+                model=self.model,
+                messages=prompt,
+                stream=on_token is not None,
+                options=self.ollama_options,
+                keep_alive=self.keep_alive,
+            )
+
+            if on_token is None:
+                content = response["message"]["content"]
+            else:
+                pieces, chunk = [], None
+                for chunk in response:
+                    piece = chunk["message"]["content"]
+                    if piece:
+                        if not pieces:
+                            FIRST_TOKEN_SECONDS.observe(time.perf_counter() - started)
+                        pieces.append(piece)
+                        on_token(piece)
+                if chunk is None:
+                    raise ValueError("Ollama returned an empty response stream")
+                response, content = chunk, "".join(pieces)
+
+        self.log(f"Ollama Response:\n{str(response)}")
+        record_tokens(response.get("prompt_eval_count"), response.get("eval_count"))
+        return content
+
+    def _query(self, collection, question: str, n_results: int) -> list:
+        """Query a collection by the question's cached embedding."""
+        return self._extract_documents(
+            collection.query(
+                query_embeddings=[self.question_embedding(question)],
+                n_results=n_results,
+            )
+        )
+
 
 def get_vanna_instance() -> VannaService:
     """Get configured Vanna instance."""
     cdir = os.getcwd()
-    vn = VannaService(
-        config={
-            "model": settings.model_name,
-            "path": os.path.join(cdir, settings.chroma_folder),
-        }
-    )
-
-    vn.connect_to_sqlite(settings.sqlite_path)
+    config = {
+        "model": settings.model_name,
+        "ollama_host": settings.ollama_host,
+        "path": os.path.join(cdir, settings.chroma_folder),
+    }
+
+    # Embed with an Ollama model instead of Chroma's bundled ONNX model.
+    if settings.embedding_model:
+        config["embedding_function"] = OllamaEmbeddingFunction(
+            url=f"{settings.ollama_host.rstrip('/')}/api/embeddings",
+            model_name=settings.embedding_model,
+        )
+
+    vn = VannaService(config=config)
+
+    # Route every query, including vanna's intermediate SQL, through the pool
+    # instead of the single connection connect_to_sqlite would open.
+    vn.dialect = "SQLite"
+    vn.run_sql = get_pool().run_sql
+    vn.run_sql_is_set = True
     return vn
 
 
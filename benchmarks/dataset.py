@@ -0,0 +1,289 @@
+"""
+Seeded synthetic SQLite dataset shaped like the telco schema in training.ipynb.
+
+Writes the database and a JSONL file of question/SQL training pairs for it.
+The same seed and sizes always produce the same rows.
+
+    python benchmarks/dataset.py --db bench.sqlite --customers 20000
+"""
+
+import argparse
+import json
+import os
+import random
+import sqlite3
+from datetime import date, timedelta
+
+SCHEMA = """
+CREATE TABLE region (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL
+);
+CREATE TABLE customer (
+    msisdn TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    gender TEXT,
+    birth_date DATE,
+    region_id INTEGER REFERENCES region (id)
+);
+CREATE TABLE product (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    type TEXT,
+    quota_mb INTEGER,
+    price INTEGER
+);
+CREATE TABLE offer (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    product_id INTEGER REFERENCES product (id),
+    price INTEGER,
+    description TEXT
+);
+CREATE TABLE campaign (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    offer_id INTEGER REFERENCES offer (id),
+    channel TEXT,
+    target_segment TEXT,
+    start_date DATE,
+    end_date DATE
+);
+CREATE TABLE send_log (
+    id INTEGER PRIMARY KEY,
+    campaign_id INTEGER REFERENCES campaign (id),
+    msisdn TEXT REFERENCES customer (msisdn),
+    sent_at DATETIME,
+    status TEXT
+);
+CREATE TABLE purchase_log (
+    id INTEGER PRIMARY KEY,
+    msisdn TEXT REFERENCES customer (msisdn),
+    product_id INTEGER REFERENCES product (id),
+    offer_id INTEGER REFERENCES offer (id),
+    purchase_date DATETIME,
+    price INTEGER,
+    payment_method TEXT,
+    status TEXT
+);
+CREATE TABLE usage_log (
+    id INTEGER PRIMARY KEY,
+    msisdn TEXT REFERENCES customer (msisdn),
+    product_id INTEGER REFERENCES product (id),
+    usage_date DATE,
+    usage_amount REAL,
+    usage_type TEXT,
+    region_id INTEGER REFERENCES region (id)
+);
+"""
+
+REGIONS = ["Jakarta", "Bandung", "Surabaya", "Medan", "Makassar", "Denpasar"]
+FIRST_NAMES = ["Andi", "Budi", "Citra", "Dewi", "Eka", "Fajar", "Gita", "Hadi"]
+LAST_NAMES = ["Pratama", "Saputra", "Wijaya", "Lestari", "Nugroho", "Putri"]
+PRODUCT_TYPES = ["data", "voice", "sms", "combo"]
+CHANNELS = ["sms", "email", "push", "ussd"]
+SEGMENTS = ["youth", "family", "business", "prepaid", "postpaid"]
+PAYMENT_METHODS = ["balance", "ewallet", "card", "bank_transfer"]
+START = date(2024, 1, 1)
+DAYS = 365
+
+QUESTIONS = [
+    (
+        "Which campaigns sent the most messages?",
+        "SELECT c.name, COUNT(s.id) AS sent FROM campaign c "
+        "JOIN send_log s ON s.campaign_id = c.id "
+        "GROUP BY c.name ORDER BY sent DESC LIMIT 10",
+    ),
+    (
+        "What are the top 10 offers by revenue?",
+        "SELECT o.name, SUM(p.price) AS revenue FROM offer o "
+        "JOIN purchase_log p ON p.offer_id = o.id "
+        "GROUP BY o.name ORDER BY revenue DESC LIMIT 10",
+    ),
+    (
+        "How many customers are there per region?",
+        "SELECT r.name, COUNT(c.msisdn) AS customers FROM region r "
+        "JOIN customer c ON c.region_id = r.id GROUP BY r.name ORDER BY customers DESC",
+    ),
+    (
+        "What was the total usage per type in 2024-01?",
+        "SELECT usage_type, SUM(usage_amount) AS total FROM usage_log "
+        "WHERE usage_date LIKE '2024-01%' GROUP BY usage_type",
+    ),
+    (
+        "How many purchases were made per product type?",
+        "SELECT pr.type, COUNT(*) AS purchases FROM purchase_log p "
+        "JOIN product pr ON pr.id = p.product_id GROUP BY pr.type",
+    ),
+    (
+        "How many customers are there by gender?",
+        "SELECT gender, COUNT(*) AS customers FROM customer GROUP BY gender",
+    ),
+]
+
+# Question templates the load driver fills in, each matching a fake LLM answer.
+TEMPLATES = [
+    "Which campaign had the top {n} send counts in {month}?",
+    "Show the top {n} offer by revenue for {month}",
+    "How many customers does each region have as of {month}?",
+    "What was the usage per type in {month}?",
+    "How many purchases per product type happened in {month}?",
+    "How many customers per gender signed up before {month}?",
+]
+
+
+def questions(count: int, seed: int = 0):
+    """Return count distinct, seeded questions built from TEMPLATES."""
+    rng = random.Random(seed)
+    seen = []
+    while len(seen) < count:
+        question = rng.choice(TEMPLATES).format(
+            n=rng.randint(3, 20),
+            month=f"2024-{rng.randint(1, 12):02d}",
+        )
+        if question not in seen:
+            seen.append(question)
+    return seen
+
+
+def generate(path: str, customers: int, events: int, seed: int = 0):
+    """Write a fresh database with customers and events rows per log table."""
+    rng = random.Random(seed)
+    if os.path.exists(path):
+        os.remove(path)
+
+    conn = sqlite3.connect(path)
+    conn.executescript(SCHEMA)
+
+    def day(offset_days=None):
+        offset_days = rng.randrange(DAYS) if offset_days is None else offset_days
+        return (START + timedelta(days=offset_days)).isoformat()
+
+    conn.executemany("INSERT INTO region VALUES (?, ?)", list(enumerate(REGIONS, 1)))
+
+    products = [
+        (
+            i,
+            f"{kind.title()} {quota} MB",
+            kind,
+            quota,
+            quota * rng.choice([5, 8, 10]),
+        )
+        for i, (kind, quota) in enumerate(
+            ((k, q) for k in PRODUCT_TYPES for q in (500, 2000, 10000)), 1
+        )
+    ]
+    conn.executemany("INSERT INTO product VALUES (?, ?, ?, ?, ?)", products)
+
+    offers = [
+        (i, f"Offer {i}", product[0], int(product[4] * 0.8), f"Promo for {product[1]}")
+        for i, product in enumerate(products * 2, 1)
+    ]
+    conn.executemany("INSERT INTO offer VALUES (?, ?, ?, ?, ?)", offers)
+
+    campaigns = []
+    for i in range(1, 41):
+        start = rng.randrange(DAYS - 30)
+        campaigns.append(
+            (
+                i,
+                f"Campaign {i}",
+                rng.choice(offers)[0],
+                rng.choice(CHANNELS),
+                rng.choice(SEGMENTS),
+                day(start),
+                day(start + 30),
+            )
+        )
+    conn.executemany("INSERT INTO campaign VALUES (?, ?, ?, ?, ?, ?, ?)", campaigns)
+
+    msisdns = [f"628{rng.randrange(10**9):09d}{i}" for i in range(customers)]
+    conn.executemany(
+        "INSERT INTO customer VALUES (?, ?, ?, ?, ?)",
+        (
+            (
+                msisdn,
+                f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+                rng.choice("MF"),
+                date(rng.randint(1960, 2005), rng.randint(1, 12), 1).isoformat(),
+                rng.randint(1, len(REGIONS)),
+            )
+            for msisdn in msisdns
+        ),
+    )
+
+    conn.executemany(
+        "INSERT INTO send_log (campaign_id, msisdn, sent_at, status) "
+        "VALUES (?, ?, ?, ?)",
+        (
+            (
+                rng.randint(1, len(campaigns)),
+                rng.choice(msisdns),
+                day(),
+                rng.choice(["delivered", "delivered", "failed"]),
+            )
+            for _ in range(events)
+        ),
+    )
+
+    def purchase():
+        offer = rng.choice(offers)
+        return (
+            rng.choice(msisdns),
+            offer[2],
+            offer[0],
+            day(),
+            offer[3],
+            rng.choice(PAYMENT_METHODS),
+            rng.choice(["success", "success", "success", "failed"]),
+        )
+
+    conn.executemany(
+        "INSERT INTO purchase_log (msisdn, product_id, offer_id, purchase_date, "
+        "price, payment_method, status) VALUES (?, ?, ?, ?, ?, ?, ?)",
+        (purchase() for _ in range(events)),
+    )
+
+    conn.executemany(
+        "INSERT INTO usage_log (msisdn, product_id, usage_date, usage_amount, "
+        "usage_type, region_id) VALUES (?, ?, ?, ?, ?, ?)",
+        (
+            (
+                rng.choice(msisdns),
+                rng.choice(products)[0],
+                day(),
+                round(rng.expovariate(1 / 50), 2),
+                rng.choice(PRODUCT_TYPES[:3]),
+                rng.randint(1, len(REGIONS)),
+            )
+            for _ in range(events)
+        ),
+    )
+
+    conn.commit()
+    conn.close()
+
+
+def write_training(path: str):
+    """Write the question/SQL training pairs as JSONL for /api/train/upload."""
+    with open(path, "w", encoding="utf-8") as file:
+        for question, sql in QUESTIONS:
+            file.write(json.dumps({"question": question, "sql": sql}) + "\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--db", default="bench.sqlite")
+    parser.add_argument("--training", default="bench_training.jsonl")
+    parser.add_argument("--customers", type=int, default=10000)
+    parser.add_argument("--events", type=int, default=50000, help="Rows per log")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    generate(args.db, args.customers, args.events, args.seed)
+    write_training(args.training)
+    print(f"Wrote {args.db} and {args.training}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,228 @@
+"""
+Deterministic stand-in for an Ollama server.
+
+Speaks the parts of Ollama's API the backend and pipeline use: /api/chat
+(streamed or not), /api/embeddings, /api/embed, /api/tags, /api/pull and the OpenAI
+compatible /v1/chat/completions. Answers are picked from the prompt, so the
+same prompt always gets the same answer, and every call sleeps for a seeded
+latency to stand in for generation time.
+
+    python benchmarks/fake_ollama.py --port 11435 --latency 0.8 --jitter 0.2
+"""
+
+import argparse
+import hashlib
+import json
+import random
+import re
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+EMBEDDING_SIZE = 384
+
+SQL_ANSWERS = [
+    (
+        "campaign",
+        "SELECT c.name, COUNT(s.id) AS sent FROM campaign c "
+        "JOIN send_log s ON s.campaign_id = c.id "
+        "GROUP BY c.name ORDER BY sent DESC LIMIT {limit}",
+    ),
+    (
+        "offer",
+        "SELECT o.name, SUM(p.price) AS revenue FROM offer o "
+        "JOIN purchase_log p ON p.offer_id = o.id "
+        "GROUP BY o.name ORDER BY revenue DESC LIMIT {limit}",
+    ),
+    (
+        "region",
+        "SELECT r.name, COUNT(c.msisdn) AS customers FROM region r "
+        "JOIN customer c ON c.region_id = r.id GROUP BY r.name ORDER BY customers DESC",
+    ),
+    (
+        "usage",
+        "SELECT usage_type, SUM(usage_amount) AS total FROM usage_log "
+        "WHERE usage_date LIKE '{month}%' GROUP BY usage_type",
+    ),
+    (
+        "product",
+        "SELECT pr.type, COUNT(*) AS purchases FROM purchase_log p "
+        "JOIN product pr ON pr.id = p.product_id GROUP BY pr.type",
+    ),
+]
+DEFAULT_SQL = "SELECT gender, COUNT(*) AS customers FROM customer GROUP BY gender"
+PLOTLY_CODE = "fig = px.bar(df, x=df.columns[0], y=df.columns[-1])"
+FOLLOWUPS = [
+    "How does this compare with last month?",
+    "Which region contributes the most?",
+    "What is the trend per week?",
+]
+
+
+def answer(messages):
+    """Pick a deterministic answer for a chat prompt."""
+    text = json.dumps(messages).lower()
+    question = messages[-1]["content"].lower() if messages else ""
+
+    if "plotly" in text:
+        return f"```python\n{PLOTLY_CODE}\n```"
+    if "followup questions" in text or "follow-up questions" in text:
+        return "\n".join(FOLLOWUPS)
+    if "questions you can ask" in text or "generate a list of questions" in text:
+        return "\n".join(f"{i}. {q}" for i, q in enumerate(FOLLOWUPS, 1))
+    if "summary" in text and "sql" not in question:
+        return "The result shows a clear leader, followed by a long tail."
+
+    limit = re.search(r"\btop (\d+)", question)
+    month = re.search(r"\b(20\d\d-\d\d)\b", question)
+    for keyword, sql in SQL_ANSWERS:
+        if keyword in question:
+            sql = sql.format(
+                limit=limit.group(1) if limit else 10,
+                month=month.group(1) if month else "2024-01",
+            )
+            return f"```sql\n{sql}\n```"
+
+    return f"```sql\n{DEFAULT_SQL}\n```"
+
+
+def embedding(text):
+    """Hash words into a fixed-size, normalized bag-of-words vector."""
+    vector = [0.0] * EMBEDDING_SIZE
+    for word in re.findall(r"\w+", text.lower()):
+        digest = hashlib.md5(word.encode()).digest()
+        vector[int.from_bytes(digest[:4], "little") % EMBEDDING_SIZE] += 1.0
+
+    norm = sum(v * v for v in vector) ** 0.5 or 1.0
+    return [v / norm for v in vector]
+
+
+class FakeOllama(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    latency = 0.0
+    jitter = 0.0
+    chunk_delay = 0.0
+    embed_latency = 0.0
+    seed = 0
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.startswith("/api/tags"):
+            model = {"name": "fake", "model": "fake"}
+            return self._json({"models": [model]})
+        if self.path.startswith("/api/version"):
+            return self._json({"version": "0.0.0-fake"})
+        self._json({"error": "not found"}, status=404)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(length) or b"{}")
+
+        if self.path.startswith("/api/pull"):
+            return self._json({"status": "success"})
+        if self.path.startswith("/api/embed") and self.embed_latency:
+            time.sleep(self.embed_latency)
+        if self.path.startswith("/api/embeddings"):
+            return self._json({"embedding": embedding(body.get("prompt", ""))})
+        if self.path.startswith("/api/embed"):
+            texts = body.get("input", [])
+            texts = [texts] if isinstance(texts, str) else texts
+            return self._json({"embeddings": [embedding(t) for t in texts]})
+
+        messages = body.get("messages", [])
+        content = answer(messages)
+        self._wait(json.dumps(messages))
+
+        if self.path.startswith("/v1/chat/completions"):
+            return self._openai(body, content)
+        if self.path.startswith("/api/chat"):
+            return self._chat(body, messages, content)
+        self._json({"error": "not found"}, status=404)
+
+    def _chat(self, body, messages, content):
+        counts = {
+            "prompt_eval_count": len(json.dumps(messages)) // 4,
+            "eval_count": len(content) // 4,
+        }
+        if not body.get("stream"):
+            message = {"role": "assistant", "content": content}
+            return self._json(
+                {"model": body.get("model"), "message": message, "done": True, **counts}
+            )
+
+        self._start("application/x-ndjson")
+        for piece in self._pieces(content):
+            message = {"role": "assistant", "content": piece}
+            self._chunk(json.dumps({"message": message, "done": False}) + "\n")
+        done = {"message": {"role": "assistant", "content": ""}, "done": True}
+        self._chunk(json.dumps({**done, **counts}) + "\n")
+        self._chunk("")
+
+    def _openai(self, body, content):
+        if not body.get("stream"):
+            choice = {"message": {"role": "assistant", "content": content}}
+            return self._json({"choices": [choice]})
+
+        self._start("text/event-stream")
+        for piece in self._pieces(content):
+            choice = {"delta": {"content": piece}}
+            self._chunk(f"data: {json.dumps({'choices': [choice]})}\n\n")
+        self._chunk("data: [DONE]\n\n")
+        self._chunk("")
+
+    def _pieces(self, content):
+        for piece in re.findall(r"\S+\s*|\s+", content):
+            if self.chunk_delay:
+                time.sleep(self.chunk_delay)
+            yield piece
+
+    def _wait(self, prompt):
+        key = int(hashlib.md5(prompt.encode()).hexdigest(), 16) + self.seed
+        delay = self.latency + random.Random(key).uniform(-self.jitter, self.jitter)
+        time.sleep(max(delay, 0.0))
+
+    def _json(self, data, status=200):
+        payload = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _start(self, content_type):
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+    def _chunk(self, text):
+        data = text.encode()
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+        self.wfile.flush()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--latency", type=float, default=0.5, help="Seconds per call")
+    parser.add_argument("--jitter", type=float, default=0.1, help="+/- seconds")
+    parser.add_argument("--chunk-delay", type=float, default=0.0, help="Per token")
+    parser.add_argument("--embed-latency", type=float, default=0.0, help="Per call")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    FakeOllama.latency = args.latency
+    FakeOllama.jitter = args.jitter
+    FakeOllama.chunk_delay = args.chunk_delay
+    FakeOllama.embed_latency = args.embed_latency
+    FakeOllama.seed = args.seed
+
+    server = ThreadingHTTPServer((args.host, args.port), FakeOllama)
+    print(f"Fake Ollama listening on http://{args.host}:{args.port}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
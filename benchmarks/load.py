@@ -0,0 +1,179 @@
+"""
+Load driver for the Vanna API.
+
+Replays generate_sql -> run_sql -> generate_plotly_figure flows at a fixed
+concurrency and reports latency percentiles and throughput per endpoint.
+Questions are seeded, so repeated runs send the same requests in the same
+order; --distinct controls how many different questions there are, and with
+it how often the caches can answer.
+
+    python benchmarks/load.py --url http://localhost:4321 --flows 200 -c 16
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import sys
+import time
+from collections import defaultdict
+from typing import Dict, List
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from dataset import QUESTIONS, questions  # noqa: E402
+
+FLOW = ["generate_sql", "run_sql", "generate_plotly_figure"]
+
+
+def percentile(values: List[float], p: float) -> float:
+    """Nearest-rank percentile of a list of values."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(math.ceil(p / 100 * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+class Recorder:
+    """Latencies and errors per endpoint."""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+
+    async def call(self, client: httpx.AsyncClient, endpoint: str, **params):
+        started = time.perf_counter()
+        try:
+            response = await client.get(f"/api/{endpoint}", params=params)
+            response.raise_for_status()
+            return response.json()
+        except (httpx.HTTPError, ValueError):
+            self.errors[endpoint] += 1
+            return None
+        finally:
+            self.latencies[endpoint].append(time.perf_counter() - started)
+
+    def report(self, elapsed: float) -> Dict[str, Dict]:
+        report = {}
+        for endpoint in [*FLOW, "flow"]:
+            values = self.latencies.get(endpoint, [])
+            report[endpoint] = {
+                "requests": len(values),
+                "errors": self.errors.get(endpoint, 0),
+                "mean": sum(values) / len(values) if values else 0.0,
+                "p50": percentile(values, 50),
+                "p95": percentile(values, 95),
+                "p99": percentile(values, 99),
+                "throughput": len(values) / elapsed if elapsed else 0.0,
+            }
+        return report
+
+
+async def flow(client, recorder, question: str, render: bool):
+    """Run one question through the three endpoints, stopping at a failure."""
+    started = time.perf_counter()
+    sql = await recorder.call(client, "generate_sql", question=question)
+    ok = sql is not None and await recorder.call(client, "run_sql", id=sql["id"])
+    if ok:
+        ok = await recorder.call(
+            client,
+            "generate_plotly_figure",
+            id=sql["id"],
+            render=str(render).lower(),
+        )
+
+    recorder.latencies["flow"].append(time.perf_counter() - started)
+    if not ok:
+        recorder.errors["flow"] += 1
+
+
+async def train(client: httpx.AsyncClient):
+    """Sync DDL from the database and load the dataset's training pairs."""
+    response = await client.post("/api/sync_schema")
+    response.raise_for_status()
+    print(f"Schema sync: {response.json()}")
+
+    pairs = [{"question": q, "sql": sql} for q, sql in QUESTIONS]
+    response = await client.post("/api/train/bulk", json=pairs)
+    response.raise_for_status()
+    print(f"Trained: {response.text.strip().splitlines()[-1]}")
+
+
+async def run(args) -> Dict[str, Dict]:
+    rng = random.Random(args.seed)
+    pool = questions(args.distinct, args.seed)
+    queue: asyncio.Queue = asyncio.Queue()
+    for _ in range(args.flows):
+        queue.put_nowait(rng.choice(pool))
+
+    recorder = Recorder()
+    limits = httpx.Limits(max_connections=args.concurrency)
+    timeout = httpx.Timeout(args.timeout)
+
+    async with httpx.AsyncClient(
+        base_url=args.url, limits=limits, timeout=timeout
+    ) as client:
+        if args.train:
+            await train(client)
+
+        async def worker():
+            while not queue.empty():
+                await flow(client, recorder, queue.get_nowait(), args.render)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+        elapsed = time.perf_counter() - started
+
+    report = recorder.report(elapsed)
+    report["run"] = {
+        "flows": args.flows,
+        "concurrency": args.concurrency,
+        "distinct": args.distinct,
+        "seconds": elapsed,
+    }
+    return report
+
+
+def print_report(report: Dict[str, Dict]):
+    run = report["run"]
+    print(
+        f"\n{run['flows']} flows, concurrency {run['concurrency']}, "
+        f"{run['distinct']} distinct questions, {run['seconds']:.2f}s\n"
+    )
+    header = f"{'endpoint':<24}{'reqs':>6}{'errs':>6}"
+    header += "".join(f"{name:>9}" for name in ("mean", "p50", "p95", "p99"))
+    print(header + f"{'req/s':>9}")
+    for endpoint in [*FLOW, "flow"]:
+        row = report[endpoint]
+        line = f"{endpoint:<24}{row['requests']:>6}{row['errors']:>6}"
+        line += "".join(f"{row[k]:>9.3f}" for k in ("mean", "p50", "p95", "p99"))
+        print(line + f"{row['throughput']:>9.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--url", default="http://localhost:4321")
+    parser.add_argument("-c", "--concurrency", type=int, default=8)
+    parser.add_argument("--flows", type=int, default=100)
+    parser.add_argument("--distinct", type=int, default=20, help="Distinct questions")
+    parser.add_argument("--render", action="store_true", help="Rasterize charts")
+    parser.add_argument("--train", action="store_true", help="Train before the run")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="Also write the report to this file")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    print_report(report)
+
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump(report, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
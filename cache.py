@@ -1,6 +1,60 @@
 from abc import ABC, abstractmethod
+from collections import OrderedDict
+import json
+import os
+import pickle
+import shutil
+import sqlite3
+import sys
+import threading
+import time
 import uuid
 
+import pyarrow as pa
+import pyarrow.feather as feather
+import pyarrow.ipc as ipc
+
+
+def sizeof(value) -> int:
+    """Estimate the heap size of a cached value in bytes."""
+    memory_usage = getattr(value, "memory_usage", None)
+    if callable(memory_usage):
+        usage = memory_usage(index=True, deep=True)
+        return int(usage.sum()) if hasattr(usage, "sum") else int(usage)
+
+    return sys.getsizeof(value)
+
+
+class SpilledFrame:
+    """
+    Handle to a DataFrame spilled to an uncompressed Arrow file on disk.
+
+    The file is memory-mapped when loaded, so the frame is only materialized
+    on the heap for the duration of the request that reads it.
+    """
+
+    def __init__(self, path: str, nbytes: int):
+        self.path = path
+        self.nbytes = nbytes
+
+    @classmethod
+    def write(cls, df, path: str, nbytes: int) -> "SpilledFrame":
+        table = pa.Table.from_pandas(df, preserve_index=True)
+        feather.write_feather(table, path, compression="uncompressed")
+        return cls(path, nbytes)
+
+    def open(self) -> pa.Table:
+        return feather.read_table(self.path, memory_map=True)
+
+    def load(self):
+        return self.open().to_pandas(split_blocks=True)
+
+    def remove(self):
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
 
 class Cache(ABC):
     @abstractmethod
@@ -11,6 +65,13 @@ class Cache(ABC):
     def get(self, id, field):
         pass
 
+    def get_arrow(self, id, field):
+        """
+        Like get, but return a DataFrame kept in an Arrow file as the
+        memory-mapped Arrow table instead of loading it onto the heap.
+        """
+        return self.get(id, field)
+
     @abstractmethod
     def get_all(self, field_list) -> list:
         pass
@@ -25,33 +86,444 @@ class Cache(ABC):
 
 
 class MemoryCache(Cache):
-    def __init__(self):
-        self.cache = {}
+    """
+    In-process cache keyed by id, holding one dict of fields per entry.
+
+    Unbounded by default. Passing max_entries, max_bytes or ttl (seconds)
+    turns it into a bounded cache: entries expire ttl seconds after they are
+    created, and the least recently used entries are evicted once the entry
+    count or the estimated byte size of all values goes over budget. The entry
+    being written is never evicted by its own write, so a single oversized
+    result is still available to the requests that follow it.
+
+    When spill_bytes is set, DataFrames larger than that are written to Arrow
+    files under spill_folder and the entry only keeps a SpilledFrame handle.
+
+    on_evict, if given, is called with the id of every entry that is evicted
+    or deleted.
+    """
+
+    def __init__(
+        self,
+        max_entries=None,
+        max_bytes=None,
+        ttl=None,
+        spill_bytes=None,
+        spill_folder="spill",
+        on_evict=None,
+    ):
+        self.cache = OrderedDict()
+        self.sizes = {}
+        self.created = {}
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.spill_bytes = spill_bytes
+        self.spill_folder = os.path.join(spill_folder, str(os.getpid()))
+        self.on_evict = on_evict
+        self.lock = threading.RLock()
+
+        if spill_bytes is not None:
+            shutil.rmtree(self.spill_folder, ignore_errors=True)
+            os.makedirs(self.spill_folder, exist_ok=True)
+
+    def generate_id(self, *args, **kwargs):
+        return str(uuid.uuid4())
+
+    def set(self, id, field, value):
+        with self.lock:
+            if id in self.cache and self._expired(id):
+                self._evict(id)
+
+            if id not in self.cache:
+                self.cache[id] = {}
+                self.sizes[id] = {}
+                self.created[id] = time.monotonic()
+
+            size = sizeof(value)
+            if self._should_spill(value, size):
+                value = self._spill(id, field, value, size)
+                size = sizeof(value)
+
+            self._discard(self.cache[id].get(field))
+            self.total_bytes += size - self.sizes[id].get(field, 0)
+            self.sizes[id][field] = size
+            self.cache[id][field] = value
+            self.cache.move_to_end(id)
+
+            self._enforce_limits(keep=id)
+
+    def get(self, id, field):
+        value, spilled = self._lookup(id, field)
+        return value.to_pandas(split_blocks=True) if spilled else value
+
+    def get_arrow(self, id, field):
+        return self._lookup(id, field)[0]
+
+    def get_all(self, field_list) -> list:
+        with self.lock:
+            return [
+                {
+                    "id": id,
+                    **{field: self._load(entry.get(field)) for field in field_list},
+                }
+                for id, entry in self.cache.items()
+                if not self._expired(id)
+            ]
+
+    def delete(self, id):
+        with self.lock:
+            if id in self.cache:
+                self._remove(id)
+
+    def stats(self) -> dict:
+        """Return size and hit/miss/eviction counters."""
+        with self.lock:
+            lookups = self.hits + self.misses
+            spilled = [
+                value
+                for entry in self.cache.values()
+                for value in entry.values()
+                if isinstance(value, SpilledFrame)
+            ]
+            return {
+                "entries": len(self.cache),
+                "bytes": self.total_bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "spilled": len(spilled),
+                "spilled_bytes": sum(value.nbytes for value in spilled),
+            }
+
+    def _lookup(self, id, field):
+        """Return a field's value, with spilled frames opened, and if spilled."""
+        with self.lock:
+            if id not in self.cache:
+                self.misses += 1
+                return None, False
+
+            if self._expired(id):
+                self._evict(id)
+                self.misses += 1
+                return None, False
+
+            if field not in self.cache[id]:
+                self.misses += 1
+                return None, False
+
+            self.cache.move_to_end(id)
+            self.hits += 1
+            value = self.cache[id][field]
+
+            if not isinstance(value, SpilledFrame):
+                return value, False
+
+            # Map the file while holding the lock so a concurrent eviction
+            # cannot remove it before it is opened.
+            return value.open(), True
+
+    def _should_spill(self, value, size) -> bool:
+        if self.spill_bytes is None or size <= self.spill_bytes:
+            return False
+
+        return callable(getattr(value, "memory_usage", None)) and hasattr(
+            value, "columns"
+        )
+
+    def _spill(self, id, field, value, size):
+        path = os.path.join(self.spill_folder, f"{id}_{field}_{uuid.uuid4()}.arrow")
+        try:
+            return SpilledFrame.write(value, path, size)
+        except (pa.ArrowException, ValueError, OSError):
+            SpilledFrame(path, size).remove()
+            return value
+
+    @staticmethod
+    def _load(value):
+        return value.load() if isinstance(value, SpilledFrame) else value
+
+    @staticmethod
+    def _discard(value):
+        if isinstance(value, SpilledFrame):
+            value.remove()
+
+    def _expired(self, id) -> bool:
+        if self.ttl is None:
+            return False
+
+        return time.monotonic() - self.created[id] > self.ttl
+
+    def _over_budget(self) -> bool:
+        if self.max_entries is not None and len(self.cache) > self.max_entries:
+            return True
+
+        return self.max_bytes is not None and self.total_bytes > self.max_bytes
+
+    def _enforce_limits(self, keep):
+        while self.cache:
+            oldest = next(iter(self.cache))
+            if oldest == keep:
+                break
+
+            if not self._expired(oldest) and not self._over_budget():
+                break
+
+            self._evict(oldest)
+
+    def _evict(self, id):
+        self._remove(id)
+        self.evictions += 1
+
+    def _remove(self, id):
+        for value in self.cache.pop(id).values():
+            self._discard(value)
+
+        del self.created[id]
+        self.total_bytes -= sum(self.sizes.pop(id).values())
+
+        if self.on_evict is not None:
+            self.on_evict(id)
+
+
+class SQLiteCache(Cache):
+    """
+    Cache stored in a SQLite database so it can be shared by several worker
+    processes on one host and survives restarts.
+
+    DataFrames are stored as Arrow IPC streams, JSON-serializable values as
+    JSON and anything else pickled. max_entries, max_bytes and ttl behave as
+    in MemoryCache, with recency tracked by the last access time. Hit, miss
+    and eviction counters are per process, and on_evict is only called for
+    entries this process evicts or deletes.
+    """
+
+    def __init__(
+        self,
+        path="cache.sqlite",
+        max_entries=None,
+        max_bytes=None,
+        ttl=None,
+        on_evict=None,
+    ):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.on_evict = on_evict
+        self.local = threading.local()
+
+        with self._connect() as conn:
+            # Lets evictions hand freed pages back so the file follows max_bytes.
+            # Only takes effect when the database file is created.
+            conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS entries (
+                    id TEXT PRIMARY KEY,
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS entries_accessed_at
+                    ON entries (accessed_at);
+                CREATE TABLE IF NOT EXISTS fields (
+                    id TEXT NOT NULL REFERENCES entries (id) ON DELETE CASCADE,
+                    field TEXT NOT NULL,
+                    kind TEXT NOT NULL,
+                    value BLOB,
+                    size INTEGER NOT NULL,
+                    PRIMARY KEY (id, field)
+                );
+                """
+            )
 
     def generate_id(self, *args, **kwargs):
         return str(uuid.uuid4())
 
     def set(self, id, field, value):
-        if id not in self.cache:
-            self.cache[id] = {}
+        kind, blob = self._dumps(value)
+        now = time.time()
+
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR IGNORE INTO entries (id, created_at, accessed_at) "
+                "VALUES (?, ?, ?)",
+                (id, now, now),
+            )
+            conn.execute(
+                "UPDATE entries SET accessed_at = ? WHERE id = ?", (now, id)
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO fields (id, field, kind, value, size) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (id, field, kind, blob, len(blob)),
+            )
 
-        self.cache[id][field] = value
+            # Every field counts towards max_bytes, not only an id's first one.
+            evicted = self._enforce_limits(conn, keep=id)
+
+        if self.on_evict is not None:
+            for evicted_id in evicted:
+                self.on_evict(evicted_id)
 
     def get(self, id, field):
-        if id not in self.cache:
-            return None
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT f.kind, f.value FROM fields f "
+                "JOIN entries e ON e.id = f.id "
+                "WHERE f.id = ? AND f.field = ? AND e.created_at >= ?",
+                (id, field, self._cutoff()),
+            ).fetchone()
+
+            if row is None:
+                self.misses += 1
+                return None
 
-        if field not in self.cache[id]:
-            return None
+            conn.execute(
+                "UPDATE entries SET accessed_at = ? WHERE id = ?", (time.time(), id)
+            )
 
-        return self.cache[id][field]
+        self.hits += 1
+        return self._loads(*row)
 
     def get_all(self, field_list) -> list:
-        return [
-            {"id": id, **{field: self.get(id=id, field=field) for field in field_list}}
-            for id in self.cache
+        conn = self._connect()
+        ids = [
+            row[0]
+            for row in conn.execute(
+                "SELECT id FROM entries WHERE created_at >= ? ORDER BY created_at",
+                (self._cutoff(),),
+            )
         ]
 
+        items = {id: {"id": id, **{field: None for field in field_list}} for id in ids}
+        if not field_list:
+            return list(items.values())
+
+        placeholders = ", ".join("?" for _ in field_list)
+        rows = conn.execute(
+            "SELECT id, field, kind, value FROM fields "
+            f"WHERE field IN ({placeholders})",
+            list(field_list),
+        )
+        for id, field, kind, blob in rows:
+            if id in items:
+                items[id][field] = self._loads(kind, blob)
+
+        return list(items.values())
+
     def delete(self, id):
-        if id in self.cache:
-            del self.cache[id]
+        with self._connect() as conn:
+            deleted = conn.execute("DELETE FROM entries WHERE id = ?", (id,)).rowcount
+
+        if deleted and self.on_evict is not None:
+            self.on_evict(id)
+
+    def stats(self) -> dict:
+        """Return size and hit/miss/eviction counters."""
+        entries, total_bytes = self._connect().execute(
+            "SELECT (SELECT COUNT(*) FROM entries), "
+            "(SELECT COALESCE(SUM(size), 0) FROM fields)"
+        ).fetchone()
+        lookups = self.hits + self.misses
+
+        return {
+            "entries": entries,
+            "bytes": total_bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA foreign_keys=ON")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self.local.conn = conn
+
+        return conn
+
+    def _cutoff(self) -> float:
+        return float("-inf") if self.ttl is None else time.time() - self.ttl
+
+    def _enforce_limits(self, conn, keep) -> list:
+        evicted = []
+        if self.ttl is not None:
+            expired = conn.execute(
+                "SELECT id FROM entries WHERE created_at < ? AND id != ?",
+                (self._cutoff(), keep),
+            ).fetchall()
+            conn.executemany("DELETE FROM entries WHERE id = ?", expired)
+            evicted.extend(row[0] for row in expired)
+
+        while True:
+            count, total_bytes = conn.execute(
+                "SELECT (SELECT COUNT(*) FROM entries), "
+                "(SELECT COALESCE(SUM(size), 0) FROM fields)"
+            ).fetchone()
+
+            over_entries = self.max_entries is not None and count > self.max_entries
+            over_bytes = self.max_bytes is not None and total_bytes > self.max_bytes
+            if not over_entries and not over_bytes:
+                break
+
+            oldest = conn.execute(
+                "SELECT id FROM entries WHERE id != ? ORDER BY accessed_at LIMIT 1",
+                (keep,),
+            ).fetchone()
+            if oldest is None:
+                break
+
+            conn.execute("DELETE FROM entries WHERE id = ?", oldest)
+            evicted.append(oldest[0])
+
+        if evicted:
+            conn.execute("PRAGMA incremental_vacuum").fetchall()
+
+        self.evictions += len(evicted)
+        return evicted
+
+    @staticmethod
+    def _dumps(value):
+        if callable(getattr(value, "memory_usage", None)) and hasattr(value, "columns"):
+            try:
+                table = pa.Table.from_pandas(value, preserve_index=True)
+                sink = pa.BufferOutputStream()
+                with ipc.new_stream(sink, table.schema) as writer:
+                    writer.write_table(table)
+                return "arrow", sink.getvalue().to_pybytes()
+            except (pa.ArrowException, ValueError):
+                pass
+
+        try:
+            return "json", json.dumps(value).encode("utf-8")
+        except (TypeError, ValueError):
+            return "pickle", pickle.dumps(value)
+
+    @staticmethod
+    def _loads(kind, blob):
+        if kind == "arrow":
+            return ipc.open_stream(pa.py_buffer(blob)).read_all().to_pandas()
+
+        if kind == "json":
+            return json.loads(blob)
+
+        return pickle.loads(blob)
@@ -13,9 +13,12 @@ import os
 import requests
 import logging
 import json
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from requests.adapters import HTTPAdapter
 from urllib.parse import urljoin
+from urllib3.util.retry import Retry
 from pydantic import BaseModel, Field
-from typing import List, Union, Generator, Iterator, Optional, Dict, Any
+from typing import List, Union, Generator, Iterator, Optional, Dict, Any, Tuple
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.DEBUG)
@@ -27,20 +30,58 @@ class APIError(Exception):
     pass
 
 
+def _make_session(retries: int, pool_size: int) -> requests.Session:
+    """
+    Creates a keep-alive HTTP session shared by every request of the pipeline.
+
+    Args:
+        retries: Retries for failed connections and 502/503/504 responses
+        pool_size: Connections kept open per host
+
+    Returns:
+        Session with pooled, retrying adapters mounted
+    """
+    # Read timeouts are not retried: the backend may still be running the LLM
+    # or the query, and a retry would start that work again.
+    retry = Retry(
+        total=retries,
+        connect=retries,
+        read=0,
+        other=0,
+        status=retries,
+        backoff_factor=0.5,
+        status_forcelist=(502, 503, 504),
+        allowed_methods=("GET",),
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry
+    )
+
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
 def _make_request(
+    session: requests.Session,
     url: str,
     params: Dict[str, Any],
     verify_ssl: bool,
     required_fields: List[str],
+    timeout: float,
 ) -> Dict[str, Any]:
     """
     Makes HTTP request and validates response.
 
     Args:
+        session: HTTP session to send the request on
         url: Request URL
         params: Request parameters
         verify_ssl: Whether to verify SSL certificates
         required_fields: Required fields in response
+        timeout: Seconds to wait for the response
 
     Returns:
         Validated JSON response
@@ -49,7 +90,7 @@ def _make_request(
         APIError: For any request or validation errors
     """
     try:
-        resp = requests.get(url, params=params, verify=verify_ssl, timeout=30)
+        resp = session.get(url, params=params, verify=verify_ssl, timeout=timeout)
         resp.raise_for_status()
         data = resp.json()
 
@@ -65,25 +106,201 @@ def _make_request(
 
 
 def _generate_sql_from_vanna(
-    api_url: str, question: str, verify_ssl: bool
+    session: requests.Session,
+    api_url: str,
+    question: str,
+    verify_ssl: bool,
+    timeout: float,
 ) -> Dict[str, Any]:
     """Generates SQL query from natural language question."""
     url = urljoin(api_url, "/api/generate_sql")
-    return _make_request(url, {"question": question}, verify_ssl, ["text", "id"])
+    return _make_request(
+        session, url, {"question": question}, verify_ssl, ["text", "id"], timeout
+    )
 
 
-def _run_sql_query(api_url: str, cache_id: str, verify_ssl: bool) -> Dict[str, Any]:
+def _run_sql_query(
+    session: requests.Session,
+    api_url: str,
+    cache_id: str,
+    verify_ssl: bool,
+    timeout: float,
+) -> Dict[str, Any]:
     """Executes SQL query using cache ID."""
     url = urljoin(api_url, "/api/run_sql")
-    return _make_request(url, {"id": cache_id}, verify_ssl, ["df_markdown"])
+    return _make_request(
+        session, url, {"id": cache_id}, verify_ssl, ["df_markdown"], timeout
+    )
 
 
 def _generate_plotly_figure(
-    api_url: str, cache_id: str, verify_ssl: bool
+    session: requests.Session,
+    api_url: str,
+    cache_id: str,
+    verify_ssl: bool,
+    timeout: float,
 ) -> Dict[str, Any]:
     """Generates Plotly figure from query results."""
     url = urljoin(api_url, "/api/generate_plotly_figure")
-    return _make_request(url, {"id": cache_id}, verify_ssl, ["chart_url"])
+    return _make_request(
+        session, url, {"id": cache_id}, verify_ssl, ["chart_url"], timeout
+    )
+
+
+def _sse_events(
+    session: requests.Session,
+    url: str,
+    params: Dict[str, Any],
+    verify_ssl: bool,
+    timeout: float,
+) -> Generator[Tuple[str, Dict[str, Any]], None, None]:
+    """
+    Reads a server-sent event stream from the backend.
+
+    Args:
+        timeout: Longest wait in seconds between two events
+
+    Yields:
+        (event, data) pairs as the backend's server-sent events arrive
+
+    Raises:
+        APIError: For any request or parsing errors
+    """
+    try:
+        with session.get(
+            url,
+            params=params,
+            verify=verify_ssl,
+            stream=True,
+            timeout=timeout,
+        ) as resp:
+            resp.raise_for_status()
+            event, data = None, []
+
+            for line in resp.iter_lines(decode_unicode=True):
+                if line.startswith("event:"):
+                    event = line[6:].strip()
+                elif line.startswith("data:"):
+                    data.append(line[5:].strip())
+                elif not line and event:
+                    yield event, json.loads("\n".join(data))
+                    event, data = None, []
+
+    except requests.exceptions.RequestException as e:
+        raise APIError(f"Request failed: {e}")
+    except json.JSONDecodeError as e:
+        raise APIError(f"Invalid JSON event: {e}")
+
+
+def _ask_vanna(
+    session: requests.Session,
+    api_url: str,
+    question: str,
+    verify_ssl: bool,
+    timeout: float,
+) -> Generator[Tuple[str, Dict[str, Any]], None, None]:
+    """Answers a question with the one-shot /api/ask endpoint."""
+    url = urljoin(api_url, "/api/ask")
+    return _sse_events(session, url, {"question": question}, verify_ssl, timeout)
+
+
+def _stream_sql_from_vanna(
+    session: requests.Session,
+    api_url: str,
+    question: str,
+    verify_ssl: bool,
+    timeout: float,
+) -> Generator[Tuple[str, Dict[str, Any]], None, None]:
+    """Generates SQL with /api/generate_sql_stream, yielding tokens as written."""
+    url = urljoin(api_url, "/api/generate_sql_stream")
+    return _sse_events(session, url, {"question": question}, verify_ssl, timeout)
+
+
+class _SQLFence:
+    """
+    Turns streamed LLM tokens into the body of a SQL code block.
+
+    The model wraps its SQL in a fence of its own, so lines that start with
+    backticks are held back until they end and dropped if they are fences.
+    Every other line is passed through token by token.
+    """
+
+    def __init__(self):
+        self.line = ""
+        self.shown = False
+        self.written = ""
+
+    def feed(self, text: str) -> str:
+        """Returns the part of the next tokens that can be shown now."""
+        start = len(self.written)
+        for i, part in enumerate(text.split("\n")):
+            if i:
+                self._end_line()
+            self.line += part
+            if self.shown:
+                self.written += part
+            elif self.line.strip() and not self._maybe_fence():
+                self.shown = True
+                self.written += self.line
+
+        return self.written[start:]
+
+    def close(self) -> str:
+        """Returns what is left of the last line and the closing fence."""
+        start = len(self.written)
+        if not self.shown and not self._maybe_fence():
+            self.written += self.line
+        if not self.written.endswith("\n"):
+            self.written += "\n"
+        return self.written[start:] + "```"
+
+    def _end_line(self):
+        line, shown = self.line, self.shown
+        self.line, self.shown = "", False
+        if shown or (not line.strip() and self.written.strip()):
+            self.written += "\n"
+        elif line.strip() and not self._maybe_fence(line):
+            self.written += f"{line}\n"
+
+    def _maybe_fence(self, line: Optional[str] = None) -> bool:
+        line = (self.line if line is None else line).strip()
+        return line.startswith("```") or "```".startswith(line)
+
+
+def _summary_prompt(
+    df_json: Any, df_md: str, digest: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    """
+    Builds the Ollama messages that summarize a query result. When the backend
+    sent a digest, only the digest is included, which keeps the prompt within
+    its token budget however large the result is.
+    """
+    if digest:
+        data = (
+            f"Carefully analyze the following digest of the query result:\n\n{digest}\n\n"
+            "**Task:**\n"
+            "Based on the column statistics, top groups and rows in the digest, provide a concise, insightful summary of the key information. "
+            "Following the summary, accurately render the first rows of the digest as a Markdown table.\n\n"
+        )
+    else:
+        data = (
+            f"Carefully analyze the following JSON data: {json.dumps(df_json)}\n\n"
+            "**Task:**\n"
+            "Based on the processed and focused data, provide a concise, insightful summary of the key information. "
+            f"Following the summary, accurately render the data into a Markdown table using the provided structure: {df_md}\n\n"
+        )
+
+    return [
+        {
+            "role": "user",
+            "content": (
+                data
+                + "**Output Format:** Your response must be **plain text**, beginning with the summary and immediately followed by the Markdown table."
+                "All currency values must be in Rupiah or IDR (the data already saved in IDR), and all numbers must be rounded to two decimal places."
+                "**Absolutely do not wrap any part of your output in a code block**.\n"
+            ),
+        }
+    ]
 
 
 class Pipeline:
@@ -106,18 +323,56 @@ class Pipeline:
             default="llama3",
             description="The name of the Ollama model to use for formatting",
         )
+        USE_ASK_ENDPOINT: bool = Field(
+            default=False,
+            description="Answer with the single streaming /api/ask request",
+        )
+        STREAM_SQL: bool = Field(
+            default=False,
+            description="Show the SQL as it is generated with /api/generate_sql_stream",
+        )
+        SQL_TIMEOUT: float = Field(
+            default=30, description="Seconds to wait for SQL generation"
+        )
+        QUERY_TIMEOUT: float = Field(
+            default=30, description="Seconds to wait for the SQL query to run"
+        )
+        CHART_TIMEOUT: float = Field(
+            default=90, description="Seconds to wait for the Plotly chart"
+        )
+        OLLAMA_TIMEOUT: float = Field(
+            default=60, description="Seconds to wait between Ollama stream chunks"
+        )
+        MAX_RETRIES: int = Field(
+            default=2,
+            description="Retries for failed connections and 502/503/504 responses",
+        )
+        POOL_SIZE: int = Field(
+            default=10, description="Keep-alive connections per host"
+        )
 
     def __init__(self):
         self.name = "Vanna Pipeline"
         fields = self.Valves.model_fields.items()
         self.valves = self.Valves(**{k: os.getenv(k, v.default) for k, v in fields})
         logger.setLevel(logging.DEBUG if self.valves.DEBUG else logging.INFO)
+        self.session = _make_session(self.valves.MAX_RETRIES, self.valves.POOL_SIZE)
+        self.executor = ThreadPoolExecutor(thread_name_prefix="vanna-chart")
 
     async def on_startup(self):
         logger.info(f"on_startup: {self.name}")
 
     async def on_shutdown(self):
         logger.info(f"on_shutdown: {self.name}")
+        self.executor.shutdown(wait=False)
+        self.session.close()
+
+    async def on_valves_updated(self):
+        logger.info(f"on_valves_updated: {self.name}")
+        logger.setLevel(logging.DEBUG if self.valves.DEBUG else logging.INFO)
+        session = self.session
+        self.session = _make_session(self.valves.MAX_RETRIES, self.valves.POOL_SIZE)
+        session.close()
 
     async def inlet(
         self, body: Dict[str, Any], user: Optional[Dict[str, Any]] = None
@@ -162,7 +417,9 @@ class Pipeline:
         url = urljoin(self.valves.OLLAMA_BASE_URL, "/v1/chat/completions")
 
         try:
-            with requests.post(url, json=payload, stream=True, timeout=60) as resp:
+            with self.session.post(
+                url, json=payload, stream=True, timeout=self.valves.OLLAMA_TIMEOUT
+            ) as resp:
                 resp.raise_for_status()
 
                 for chunk in resp.iter_lines(decode_unicode=True):
@@ -192,6 +449,111 @@ class Pipeline:
         except requests.exceptions.RequestException as e:
             raise APIError(f"Ollama request failed: {e}")
 
+    def stream_sql(self, question: str) -> Generator[str, None, Dict[str, Any]]:
+        """
+        Shows the SQL in a code block while the backend generates it and
+        returns the final sql event. Answers the backend already had arrive
+        without tokens and are shown whole. A reset event closes the block of
+        an intermediate query, and the final SQL streams into a new one.
+        """
+        fence = None
+
+        for event, data in _stream_sql_from_vanna(
+            self.session,
+            self.valves.API_URL,
+            question,
+            self.valves.VERIFY_SSL,
+            self.valves.SQL_TIMEOUT,
+        ):
+            if event == "token":
+                if fence is None:
+                    fence = _SQLFence()
+                    yield "```sql\n"
+                text = fence.feed(data["text"])
+                if text:
+                    yield text
+
+            elif event == "reset":
+                if fence is not None:
+                    yield fence.close() + "\n\n"
+                    fence = None
+
+            elif event == "sql":
+                if fence is None:
+                    yield f"```sql\n{data['text']}\n```"
+                else:
+                    yield fence.close()
+                return data
+
+            elif event == "error":
+                if fence is not None:
+                    yield fence.close()
+                raise APIError(data["error"])
+
+        raise APIError("SQL stream ended without a sql event")
+
+    def ask(self, question: str) -> Generator[Union[str, Dict[str, Any]], None, None]:
+        """
+        Answers a question through /api/ask. The backend runs every stage
+        itself, so the chart and follow-ups are being generated while the
+        summary streams from Ollama.
+        """
+        yield self.status("Generating SQL...", False)
+
+        try:
+            timeout = max(
+                self.valves.SQL_TIMEOUT,
+                self.valves.QUERY_TIMEOUT,
+                self.valves.CHART_TIMEOUT,
+            )
+            for event, data in _ask_vanna(
+                self.session,
+                self.valves.API_URL,
+                question,
+                self.valves.VERIFY_SSL,
+                timeout,
+            ):
+                if event == "sql":
+                    yield f"```sql\n{data['text']}\n```"
+                    yield self.status(
+                        "Running SQL query and rendering results...", False
+                    )
+
+                elif event == "df":
+                    yield "\n### Data result\n\n"
+                    yield from self.ollama(
+                        _summary_prompt(
+                            data.get("df", {}), data["df_markdown"], data.get("digest")
+                        )
+                    )
+                    yield self.status("Generating Plotly chart...", False)
+
+                elif event == "plotly_figure" and data.get("chart_url"):
+                    chart_url = data["chart_url"]
+                    yield "\n### Visualization\n\n"
+                    yield f"\n![{chart_url}]({chart_url})\n\n"
+
+                elif event == "question_list" and data.get("questions"):
+                    yield "\n### Follow-up questions\n\n"
+                    yield "".join(f"- {q}\n" for q in data["questions"])
+
+                elif event == "error" and data.get("stage") in ("sql", "df"):
+                    logger.error(f"{data['stage']} stage error: {data['error']}")
+                    yield self.status(f"Error during {data['stage']} stage", True)
+                    return
+
+                elif event == "error":
+                    logger.warning(
+                        f"{data.get('stage')} stage skipped: {data['error']}"
+                    )
+
+        except APIError as e:
+            logger.exception(f"Ask request error: {e}")
+            yield self.status("Error while answering the question", True)
+            return
+
+        yield self.status("Formatting results complete", True)
+
     def pipe(
         self,
         user_message: str,
@@ -209,18 +571,28 @@ class Pipeline:
                 yield f"Error processing task: {e}"
             return
 
+        if self.valves.USE_ASK_ENDPOINT:
+            yield from self.ask(user_message)
+            return
+
         cache_id = None
 
         try:
             yield self.status("Generating SQL...", False)
 
-            resp = _generate_sql_from_vanna(
-                self.valves.API_URL, user_message, self.valves.VERIFY_SSL
-            )
-            sql_text = resp["text"]
-            cache_id = resp["id"]
+            if self.valves.STREAM_SQL:
+                resp = yield from self.stream_sql(user_message)
+            else:
+                resp = _generate_sql_from_vanna(
+                    self.session,
+                    self.valves.API_URL,
+                    user_message,
+                    self.valves.VERIFY_SSL,
+                    self.valves.SQL_TIMEOUT,
+                )
+                yield f"```sql\n{resp['text']}\n```"
 
-            yield f"```sql\n{sql_text}\n```"
+            cache_id = resp["id"]
 
         except APIError as e:
             logger.exception(f"SQL generation error: {e}")
@@ -230,26 +602,30 @@ class Pipeline:
         try:
             yield self.status("Running SQL query and rendering results...", False)
 
-            resp = _run_sql_query(self.valves.API_URL, cache_id, self.valves.VERIFY_SSL)
+            resp = _run_sql_query(
+                self.session,
+                self.valves.API_URL,
+                cache_id,
+                self.valves.VERIFY_SSL,
+                self.valves.QUERY_TIMEOUT,
+            )
             df_json = resp.get("df", {})
             df_md = resp["df_markdown"]
+            digest = resp.get("digest")
+
+            # Start the chart now so it renders while the summary streams.
+            chart = self.executor.submit(
+                _generate_plotly_figure,
+                self.session,
+                self.valves.API_URL,
+                cache_id,
+                self.valves.VERIFY_SSL,
+                self.valves.CHART_TIMEOUT,
+            )
 
             yield "\n### Data result\n\n"
 
-            prompt_msgs = [
-                {
-                    "role": "user",
-                    "content": (
-                        f"Carefully analyze the following JSON data: {json.dumps(df_json)}\n\n"
-                        "**Task:**\n"
-                        "Based on the processed and focused data, provide a concise, insightful summary of the key information. "
-                        f"Following the summary, accurately render the data into a Markdown table using the provided structure: {df_md}\n\n"
-                        "**Output Format:** Your response must be **plain text**, beginning with the summary and immediately followed by the Markdown table."
-                        "All currency values must be in Rupiah or IDR (the data already saved in IDR), and all numbers must be rounded to two decimal places."
-                        "**Absolutely do not wrap any part of your output in a code block**.\n"
-                    ),
-                }
-            ]
+            prompt_msgs = _summary_prompt(df_json, df_md, digest)
 
             yield from self.ollama(prompt_msgs)
 
@@ -261,15 +637,13 @@ class Pipeline:
         try:
             yield self.status("Generating Plotly chart...", False)
 
-            resp = _generate_plotly_figure(
-                self.valves.API_URL, cache_id, self.valves.VERIFY_SSL
-            )
+            resp = chart.result(timeout=self.valves.CHART_TIMEOUT)
             chart_url = resp["chart_url"]
 
             yield "\n### Visualization\n\n"
             yield f"\n![{chart_url}]({chart_url})\n\n"
 
-        except APIError as e:
+        except (APIError, TimeoutError) as e:
             logger.warning(f"Could not generate Plotly chart: {e}")
             yield self.status("Plotly chart generation skipped", True)
 
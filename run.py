@@ -1,13 +1,33 @@
 import os
+import sys
+import tempfile
 import uvicorn
+from app.config import settings
 
-DEBUG = os.environ.get("DEBUG", False)
 PORT = int(os.environ.get("PORT", 8000))
 
 if __name__ == "__main__":
+    # Workers only share cached results through the SQLite backend; with the
+    # in-process cache, ids made by one worker are unknown to the others.
+    if settings.workers > 1 and settings.cache_backend == "memory":
+        sys.exit("WORKERS > 1 needs CACHE_BACKEND=sqlite")
+
+    # Each worker keeps its own metrics; in multiprocess mode prometheus_client
+    # writes them to files here and /metrics adds up those of every worker.
+    if settings.workers > 1:
+        folder = os.environ.setdefault(
+            "PROMETHEUS_MULTIPROC_DIR", tempfile.mkdtemp(prefix="vanna_metrics_")
+        )
+        os.makedirs(folder, exist_ok=True)
+        for name in os.listdir(folder):
+            if name.endswith(".db"):
+                os.remove(os.path.join(folder, name))
+
+    # uvicorn ignores workers when reloading, so only reload a single worker.
     uvicorn.run(
         "app.main:app",
         host="localhost",
-        reload=DEBUG,
+        reload=settings.debug and settings.workers == 1,
         port=PORT,
+        workers=settings.workers,
     )